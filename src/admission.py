@@ -0,0 +1,147 @@
+"""
+Admission control for inbound message writes.
+
+At most `max_in_flight` writes run at once. When that limit is reached,
+further requests wait in a priority queue (urgent, then high, then normal;
+first come first served within a priority). Normal traffic may only use a
+small part of the queue. Beyond that it is shed straight away with a
+Retry-After hint, so urgent messages keep moving while the write path is
+saturated.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from src.config import get_settings
+from src.logging_config import logger
+
+PRIORITY_RANK = {"urgent": 0, "high": 1, "normal": 2}
+
+class Overloaded(Exception):
+    """Raised when a request is shed; `retry_after` is a hint in whole seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Overloaded ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """Bounded in-flight limit with a priority-ordered wait queue."""
+
+    def __init__(
+        self,
+        max_in_flight: int = 16,
+        max_queue: int = 64,
+        normal_queue: int = 16,
+        queue_timeout: float = 5.0
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.normal_queue = normal_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        # Exponentially weighted average time a request holds its slot
+        self._service_time = 0.05
+        self.admitted = {priority: 0 for priority in PRIORITY_RANK}
+        self.queued = {priority: 0 for priority in PRIORITY_RANK}
+        self.shed = {priority: 0 for priority in PRIORITY_RANK}
+        self.shed_reasons = {"queue_full": 0, "timeout": 0}
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue should have drained, at least 1."""
+        backlog = (self.queue_depth + 1) * self._service_time / max(self.max_in_flight, 1)
+        return max(1, math.ceil(backlog))
+
+    def _shed(self, priority: str, reason: str) -> Overloaded:
+        self.shed[priority] += 1
+        self.shed_reasons[reason] += 1
+        retry_after = self.retry_after()
+        logger.warning(
+            f"Shedding {priority} request ({reason}): {self.in_flight} in flight, {self.queue_depth} queued"
+        )
+        return Overloaded(reason, retry_after)
+
+    async def _acquire(self, priority: str):
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self.admitted[priority] += 1
+            return
+
+        limit = self.normal_queue if priority == "normal" else self.max_queue
+        if self.queue_depth >= limit:
+            raise self._shed(priority, "queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (PRIORITY_RANK[priority], next(self._order), future)
+        heapq.heappush(self._waiters, entry)
+        self.queued[priority] += 1
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we gave up; pass it on
+                self._release()
+            elif entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._shed(priority, "timeout") from None
+            raise
+        self.admitted[priority] += 1
+
+    def _release(self):
+        # Hand the slot straight to the most urgent waiter, if any
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def admit(self, priority: str):
+        """Hold a write slot for the duration of the block; raises Overloaded if shed."""
+        await self._acquire(priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._service_time = 0.9 * self._service_time + 0.1 * (time.monotonic() - started)
+            self._release()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": self.queue_depth,
+            "service_time_ms": round(self._service_time * 1000, 2),
+            "admitted": dict(self.admitted),
+            "queued": dict(self.queued),
+            "shed": dict(self.shed),
+            "shed_reasons": dict(self.shed_reasons)
+        }
+
+# Global singleton instance
+_admission_controller: AdmissionController | None = None
+
+def get_admission_controller() -> AdmissionController:
+    """Get the global admission controller."""
+    global _admission_controller
+    if _admission_controller is None:
+        settings = get_settings()
+        _admission_controller = AdmissionController(
+            max_in_flight=settings.ADMISSION_MAX_IN_FLIGHT,
+            max_queue=settings.ADMISSION_MAX_QUEUE,
+            normal_queue=settings.ADMISSION_NORMAL_QUEUE,
+            queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT
+        )
+    return _admission_controller
@@ -0,0 +1,203 @@
+"""
+API key authentication and per-key rate limiting.
+
+Keys are stored hashed (SHA-256) in API_KEYS_FILE, one entry per peer:
+
+    {"keys": [{"name": "Patterson", "sha256": "<hex digest>", "rate": 20, "burst": 40}]}
+
+The file is re-read when it changes, so keys can be added or rotated without a
+restart. The legacy API_KEY setting is always accepted as the key named "default".
+It is not rate limited unless API_KEY_DEFAULT_RATE is set: in deployments
+without a key file it carries all traffic (peer, MCP bridge, subscribers).
+
+Generate a key for a peer with:
+
+    python -m src.auth <peer name>
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sys
+import time
+from pydantic import SecretStr
+from src.config import get_settings
+from src.logging_config import logger
+
+def hash_api_key(key: str) -> bytes:
+    return hashlib.sha256(key.encode("utf-8")).digest()
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def consume(self) -> float:
+        """Take one token. Returns 0 on success, otherwise seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class UnlimitedBucket:
+    """Stands in for a TokenBucket on keys without a rate limit."""
+
+    rate = None
+    capacity = None
+
+    def consume(self) -> float:
+        return 0.0
+
+class ApiKey:
+    """An accepted key, identified by name, with its own rate limit (None for unlimited)."""
+
+    __slots__ = ("name", "digest", "bucket")
+
+    def __init__(self, name: str, digest: bytes, rate: float | None, burst: float | None):
+        self.name = name
+        self.digest = digest
+        self.bucket = TokenBucket(rate, burst) if rate is not None else UnlimitedBucket()
+
+class ApiKeyStore:
+    """In-memory lookup of hashed API keys, reloaded when the key file changes."""
+
+    def __init__(
+        self,
+        path: str,
+        default_key: SecretStr | None = None,
+        rate: float = 20.0,
+        burst: float = 40.0,
+        reload_interval: float = 5.0,
+        default_rate: float | None = None
+    ):
+        self.path = path
+        self.default_key = default_key
+        self.rate = rate
+        self.burst = burst
+        self.default_rate = default_rate
+        self.reload_interval = reload_interval
+        self._keys: dict[bytes, ApiKey] = {}
+        self._mtime = self._stat_mtime()
+        self._checked_at = time.monotonic()
+        self._load()
+
+    def _stat_mtime(self) -> float | None:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def _read_entries(self) -> list[dict]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f).get("keys", [])
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not read API key file {self.path}: {e}")
+            return []
+
+    def _load(self):
+        entries = []
+        if self.default_key is not None:
+            entries.append({
+                "name": "default",
+                "digest": hash_api_key(self.default_key.get_secret_value()),
+                "rate": self.default_rate,
+                "burst": self.burst if self.default_rate is not None else None
+            })
+        for entry in self._read_entries():
+            try:
+                entries.append({**entry, "digest": bytes.fromhex(entry["sha256"])})
+            except (KeyError, ValueError):
+                logger.error(f"Skipping malformed API key entry: {entry.get('name', '?')}")
+
+        keys = {}
+        for entry in entries:
+            existing = self._keys.get(entry["digest"])
+            rate = entry.get("rate", self.rate)
+            burst = entry.get("burst", self.burst)
+            if existing is not None and existing.bucket.rate == rate and existing.bucket.capacity == burst:
+                # Unchanged key keeps its bucket across reloads
+                existing.name = entry["name"]
+                keys[entry["digest"]] = existing
+            else:
+                keys[entry["digest"]] = ApiKey(entry["name"], entry["digest"], rate, burst)
+
+        self._keys = keys
+        logger.debug(f"Loaded {len(keys)} API keys")
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        mtime = self._stat_mtime()
+        if mtime != self._mtime:
+            self._mtime = mtime
+            self._load()
+            logger.info(f"API keys reloaded from {self.path}")
+
+    def authenticate(self, key: str) -> ApiKey | None:
+        """Return the matching key entry, or None if the key is not accepted."""
+        self._maybe_reload()
+        digest = hash_api_key(key)
+        entry = self._keys.get(digest)
+        if entry is None or not hmac.compare_digest(entry.digest, digest):
+            return None
+        return entry
+
+# Global singleton instance
+_api_key_store: ApiKeyStore | None = None
+
+def get_api_key_store() -> ApiKeyStore:
+    """Get the global API key store."""
+    global _api_key_store
+    if _api_key_store is None:
+        settings = get_settings()
+        _api_key_store = ApiKeyStore(
+            settings.API_KEYS_FILE,
+            default_key=settings.API_KEY,
+            rate=settings.API_KEY_RATE,
+            burst=settings.API_KEY_BURST,
+            reload_interval=settings.API_KEYS_RELOAD_INTERVAL,
+            default_rate=settings.API_KEY_DEFAULT_RATE
+        )
+    return _api_key_store
+
+def add_api_key(path: str, name: str) -> str:
+    """Generate a new key for `name`, store its hash in the key file and return the key."""
+    key = secrets.token_urlsafe(32)
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        data = {"keys": []}
+
+    data["keys"].append({"name": name, "sha256": hash_api_key(key).hex()})
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+    return key
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python -m src.auth <peer name>", file=sys.stderr)
+        sys.exit(1)
+    path = get_settings().API_KEYS_FILE
+    print(add_api_key(path, sys.argv[1]))
+    print(f"Hash stored in {path}; give the key above to {sys.argv[1]}", file=sys.stderr)
@@ -1,108 +1,120 @@
-"""Background tasks for message retry processing."""
+"""Background tasks for message retry processing and peer health monitoring."""
 
 import asyncio
+from src.config import get_settings
+from src.circuit_breaker import CircuitState
+from src.peers import Peer
 from src.db.connection import get_db_connection
 from src.db.models import MessageStatus
 from src.db.repositories.message_repository import MessageRepository
-from src.client import send_to_remote
+from src.client import deliver_message, check_remote_status, DeliveryError
 from src.logging_config import logger
+from src import tracing
 
-async def process_retry_queue():
+async def process_retry_queue(peer: Peer):
     """
-    Background task to retry failed outbox messages.
+    Background task to retry failed outbox deliveries to one peer.
+    Each peer gets its own lane so an offline peer never delays the others.
     Runs every 60 seconds, retries messages up to 3 times.
+    Skips the peer while its circuit breaker is open and drains
+    immediately once it closes again.
     """
-    logger.info("Starting retry queue processor")
+    logger.info(f"Starting retry queue processor for {peer.name}")
     max_retries = 3
     retry_interval = 60  # seconds
+    breaker = peer.breaker
 
     while True:
         try:
-            await asyncio.sleep(retry_interval)
+            if await breaker.wait_for_recovery(retry_interval):
+                logger.info(f"{peer.name} recovered, draining outbox")
+
+            if not breaker.allow_request():
+                logger.debug(f"Circuit for {peer.name} open, skipping retry cycle")
+                continue
 
             db_conn = get_db_connection()
             conn = await db_conn.get_async_connection()
             repo = MessageRepository(conn)
 
             # Get messages needing retry
-            pending_messages = await repo.get_pending_outbox_messages(max_retries)
+            pending_messages = await repo.get_pending_outbox_messages(peer.name, max_retries)
 
             if not pending_messages:
-                logger.debug("No messages in retry queue")
+                logger.debug(f"No messages in retry queue for {peer.name}")
                 continue
 
-            logger.info(f"Processing {len(pending_messages)} messages in retry queue")
+            logger.info(f"Processing {len(pending_messages)} messages in retry queue for {peer.name}")
+
+            for index, msg in enumerate(pending_messages):
+                # The first attempt was already cleared by allow_request() above
+                if index > 0 and not breaker.allow_request():
+                    logger.info(f"Circuit for {peer.name} opened, deferring {len(pending_messages) - index} messages")
+                    break
 
-            for msg in pending_messages:
                 msg_id = msg['id']
-                logger.debug(f"Retrying message {msg_id} (attempt {msg['retry_count'] + 1}/{max_retries})")
+                logger.debug(f"Retrying message {msg_id} to {peer.name} (attempt {msg['retry_count'] + 1}/{max_retries})")
 
                 # Increment retry count
-                await repo.increment_retry_count(msg_id)
-
-                # Attempt to resend (this creates a NEW outbox entry)
-                # Actually, we should just update the existing one
-                # Let me think about this differently...
-
-                # We need to send without creating another outbox entry
-                # So I'll call the HTTP logic directly here
-
-                from urllib.parse import urlparse
-                import httpx
-                from src.config import get_settings
-                from src.resolver import resolve_mdns
-
-                settings = get_settings()
-                base_url = settings.REMOTE_PAI_URL
-                parsed = urlparse(base_url)
-
-                # Resolve mDNS if needed
-                if parsed.hostname and parsed.hostname.endswith('.local'):
-                    try:
-                        resolved_ip = resolve_mdns(parsed.hostname)
-                        new_netloc = parsed.netloc.replace(parsed.hostname, resolved_ip)
-                        base_url = parsed._replace(netloc=new_netloc).geturl()
-                    except Exception as e:
-                        error_msg = f"mDNS resolution failed: {str(e)}"
-                        logger.warning(f"Retry {msg_id} failed at mDNS: {error_msg}")
-                        if msg['retry_count'] >= max_retries:
-                            await repo.update_outbox_status(msg_id, MessageStatus.FAILED, error_msg)
-                        continue
-
-                url = f"{base_url}/inbox"
+                await repo.increment_retry_count(msg_id, peer.name)
 
                 payload = {
                     "sender": msg['sender'],
                     "content": msg['content'],
                     "priority": msg['priority'],
                     "message_type": msg['message_type'],
-                    "context_id": msg['context_id']
+                    "context_id": msg['context_id'],
+                    # Original send time, so the peer's latency includes retry delay
+                    "timestamp": f"{msg['created_at'].replace(' ', 'T')}+00:00"
                 }
 
-                headers = {
-                    "X-PAI-API-Key": settings.REMOTE_PAI_API_KEY.get_secret_value(),
-                    "Host": parsed.hostname
-                }
-
-                async with httpx.AsyncClient() as client:
+                attributes = {"pai.message_id": msg_id, "pai.peer": peer.name, "pai.attempt": msg['retry_count'] + 1}
+                with tracing.span("retry", trace_id=tracing.message_trace_id(msg_id), **attributes) as retry_span:
                     try:
-                        response = await client.post(url, json=payload, headers=headers, timeout=5.0)
-                        response.raise_for_status()
+                        await deliver_message(peer, payload)
 
                         # Success! Update to sent
-                        await repo.update_outbox_status(msg_id, MessageStatus.SENT)
-                        logger.info(f"Retry successful for message {msg_id}")
+                        with tracing.span("db.commit"):
+                            await repo.update_delivery_status(msg_id, peer.name, MessageStatus.SENT)
+                        logger.info(f"Retry successful for message {msg_id} to {peer.name}")
 
-                    except (httpx.HTTPStatusError, httpx.RequestError) as e:
+                    except DeliveryError as e:
                         error_msg = str(e)
-                        logger.warning(f"Retry {msg_id} failed (attempt {msg['retry_count']}/{max_retries}): {error_msg}")
+                        retry_span.error = error_msg
+                        logger.warning(f"Retry {msg_id} to {peer.name} failed (attempt {msg['retry_count']}/{max_retries}): {error_msg}")
 
                         # If this was the last retry, mark as permanently failed
                         if msg['retry_count'] >= max_retries:
-                            await repo.update_outbox_status(msg_id, MessageStatus.FAILED, f"Max retries exceeded: {error_msg}")
-                            logger.error(f"Message {msg_id} permanently failed after {max_retries} retries")
+                            with tracing.span("db.commit"):
+                                await repo.update_delivery_status(msg_id, peer.name, MessageStatus.FAILED, f"Max retries exceeded: {error_msg}")
+                            logger.error(f"Message {msg_id} to {peer.name} permanently failed after {max_retries} retries")
 
         except Exception as e:
-            logger.exception(f"Error in retry queue processor: {e}")
+            logger.exception(f"Error in retry queue processor for {peer.name}: {e}")
             # Continue running despite errors
             await asyncio.sleep(retry_interval)
+
+async def monitor_remote_health(peer: Peer):
+    """
+    Background task that probes a peer's /health endpoint while its
+    circuit breaker is open, closing it as soon as the peer is back online.
+    """
+    settings = get_settings()
+    breaker = peer.breaker
+    logger.info(f"Starting health monitor for {peer.name}")
+
+    while True:
+        try:
+            await asyncio.sleep(settings.HEALTH_PROBE_INTERVAL)
+
+            if breaker.state == CircuitState.CLOSED:
+                continue
+
+            result = await check_remote_status(peer.name)
+            if result.get("status") == "online":
+                breaker.record_success()
+            else:
+                logger.debug(f"{peer.name} still unavailable: {result.get('details')}")
+
+        except Exception as e:
+            logger.exception(f"Error in health monitor for {peer.name}: {e}")
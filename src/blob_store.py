@@ -0,0 +1,115 @@
+"""
+Content-addressed storage for large message payloads.
+
+Content above BLOB_THRESHOLD bytes is written to BLOB_DIR under its SHA-256
+digest and the message row keeps only the digest and size, so the messages
+table stays small for history scans. Identical payloads share one file.
+
+Layout: <BLOB_DIR>/<first two hex chars>/<full hex digest>
+"""
+
+import codecs
+import hashlib
+import os
+import tempfile
+from typing import AsyncIterator
+from src.config import get_settings
+from src.logging_config import logger
+
+class BlobTooLarge(ValueError):
+    """Raised when a streamed upload exceeds the configured maximum size."""
+
+class BlobNotText(ValueError):
+    """Raised when a streamed upload is not valid UTF-8."""
+
+class BlobStore:
+    """Files on disk addressed by the SHA-256 of their content."""
+
+    def __init__(self, root: str, threshold: int = 65536, max_size: int = 64 * 1024 * 1024):
+        self.root = root
+        self.threshold = threshold
+        self.max_size = max_size
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+
+    def should_externalize(self, content: str) -> bool:
+        # UTF-8 is at most 4 bytes per character, so most content skips the encode
+        if len(content) * 4 <= self.threshold:
+            return False
+        return len(content) > self.threshold or len(content.encode("utf-8")) > self.threshold
+
+    def _commit(self, tmp_path: str, digest: str):
+        target = self.path(digest)
+        if os.path.exists(target):
+            os.remove(tmp_path)  # Already stored; keep the existing file
+            return
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(tmp_path, target)
+
+    def _tempfile(self):
+        os.makedirs(self.root, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=self.root, prefix=".upload-", delete=False)
+
+    def put(self, data: bytes) -> str:
+        """Store `data` and return its digest. Blocking; call via asyncio.to_thread."""
+        digest = hashlib.sha256(data).hexdigest()
+        if self.exists(digest):
+            return digest
+        with self._tempfile() as f:
+            f.write(data)
+        self._commit(f.name, digest)
+        logger.debug(f"Stored blob {digest} ({len(data)} bytes)")
+        return digest
+
+    async def put_stream(self, chunks: AsyncIterator[bytes]) -> tuple[str, int]:
+        """
+        Store a streamed UTF-8 body without holding it in memory.
+        Returns (digest, size).
+        """
+        hasher = hashlib.sha256()
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        size = 0
+        f = self._tempfile()
+        try:
+            with f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.max_size:
+                        raise BlobTooLarge(f"Body exceeds {self.max_size} bytes")
+                    decoder.decode(chunk)
+                    hasher.update(chunk)
+                    f.write(chunk)
+                decoder.decode(b"", final=True)
+        except (BlobTooLarge, UnicodeDecodeError) as e:
+            os.remove(f.name)
+            if isinstance(e, UnicodeDecodeError):
+                raise BlobNotText("Body is not valid UTF-8") from e
+            raise
+        except BaseException:
+            os.remove(f.name)
+            raise
+
+        digest = hasher.hexdigest()
+        self._commit(f.name, digest)
+        logger.debug(f"Stored streamed blob {digest} ({size} bytes)")
+        return digest, size
+
+    def read_text(self, digest: str) -> str:
+        """Load a blob's content. Blocking; call via asyncio.to_thread."""
+        with open(self.path(digest), "rb") as f:
+            return f.read().decode("utf-8")
+
+# Global singleton instance
+_blob_store: BlobStore | None = None
+
+def get_blob_store() -> BlobStore:
+    """Get the global blob store."""
+    global _blob_store
+    if _blob_store is None:
+        settings = get_settings()
+        _blob_store = BlobStore(settings.BLOB_DIR, settings.BLOB_THRESHOLD, settings.BLOB_MAX_SIZE)
+    return _blob_store
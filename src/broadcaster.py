@@ -0,0 +1,65 @@
+"""In-process fan-out of newly received inbox messages to live subscribers."""
+
+import asyncio
+from src.logging_config import logger
+
+class Subscription:
+    """
+    A single subscriber's bounded queue of message events.
+
+    If the subscriber falls behind and the queue fills up, further events are
+    dropped and `overflowed` is set; the consumer is expected to catch up from
+    the database using its last cursor.
+    """
+
+    def __init__(self, max_queue_size: int):
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=max_queue_size)
+        self.overflowed = False
+
+    def push(self, event: dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def drain(self):
+        """Discard queued events and clear the overflow flag before a catch-up read."""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.overflowed = False
+
+class MessageBroadcaster:
+    """Publishes committed inbox messages to every active subscription."""
+
+    def __init__(self, max_queue_size: int = 100):
+        self.max_queue_size = max_queue_size
+        self._subscriptions: set[Subscription] = set()
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscriptions)
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.max_queue_size)
+        self._subscriptions.add(subscription)
+        logger.debug(f"New inbox subscriber ({len(self._subscriptions)} active)")
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+        logger.debug(f"Inbox subscriber left ({len(self._subscriptions)} active)")
+
+    def publish(self, event: dict):
+        """Push an event to all subscribers without blocking the publisher."""
+        for subscription in self._subscriptions:
+            subscription.push(event)
+
+# Global singleton instance
+_broadcaster: MessageBroadcaster | None = None
+
+def get_message_broadcaster() -> MessageBroadcaster:
+    """Get the global inbox message broadcaster."""
+    global _broadcaster
+    if _broadcaster is None:
+        _broadcaster = MessageBroadcaster()
+    return _broadcaster
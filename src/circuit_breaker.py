@@ -0,0 +1,82 @@
+"""Circuit breaker guarding outbound calls to remote PAI peers."""
+
+import asyncio
+import time
+from enum import Enum
+from src.logging_config import logger
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """
+    Tracks consecutive delivery failures to a remote PAI peer.
+
+    After `failure_threshold` consecutive failures the circuit opens and callers
+    should skip the network entirely. Once `reset_timeout` seconds have passed a
+    single trial request is let through (half-open); the health monitor can also
+    close the circuit early when the remote reports online.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0, name: str = "remote"):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None
+        self._open = False
+        self._recovered = asyncio.Event()
+
+    @property
+    def state(self) -> CircuitState:
+        if not self._open:
+            return CircuitState.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return CircuitState.HALF_OPEN
+        return CircuitState.OPEN
+
+    def allow_request(self) -> bool:
+        """Return True if an outbound call should be attempted right now."""
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return True
+        if state == CircuitState.HALF_OPEN:
+            # Let one trial through and re-arm the timer so concurrent
+            # callers keep short-circuiting until it resolves
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+    def record_success(self):
+        """Reset the failure count and close the circuit."""
+        if self._open:
+            logger.info(f"Circuit breaker for {self.name} closed: peer reachable again")
+            self._recovered.set()
+        self._open = False
+        self.opened_at = None
+        self.consecutive_failures = 0
+
+    def record_failure(self):
+        """Count a failure, opening the circuit once the threshold is reached."""
+        self.consecutive_failures += 1
+        if self._open or self.consecutive_failures >= self.failure_threshold:
+            if not self._open:
+                logger.warning(
+                    f"Circuit breaker for {self.name} opened after {self.consecutive_failures} consecutive failures"
+                )
+            self._open = True
+            self.opened_at = time.monotonic()
+
+    async def wait_for_recovery(self, timeout: float) -> bool:
+        """
+        Sleep up to `timeout` seconds, returning early (True) if the circuit
+        closes after having been open.
+        """
+        try:
+            await asyncio.wait_for(self._recovered.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._recovered.clear()
+        return True
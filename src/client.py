@@ -1,124 +1,390 @@
+import asyncio
 import httpx
+from datetime import datetime, timezone
 from urllib.parse import urlparse
 from src.config import get_settings
 from src.models import Message
 from src.resolver import resolve_mdns
+from src.peers import Peer, get_peer_registry
+from src.peer_link import LinkUnavailable, LinkRejected
+from src.blob_store import get_blob_store
+from src.ids import new_message_id
+from src import tracing
 from src.db.connection import get_db_connection
-from src.db.models import MessageStatus
+from src.db.models import MessageStatus, MessageType, Priority
 from src.db.repositories.message_repository import MessageRepository
 from src.logging_config import logger
-import uuid
 
 settings = get_settings()
 
+LARGE_MESSAGE_TIMEOUT = 60.0  # seconds, for bodies sent to /inbox/stream
+
+class DeliveryError(Exception):
+    """Raised when a message could not be delivered to a remote peer."""
+
+def _utc_now() -> str:
+    """Send time for the payload's timestamp; the peer measures delivery latency from it."""
+    return datetime.now(timezone.utc).isoformat()
+
+def _resolve_base_url(peer: Peer) -> tuple[str, str | None]:
+    """
+    Returns the peer's base URL with any .local hostname resolved to an IP,
+    along with the original hostname for the Host header.
+    """
+    base_url = peer.url
+    parsed = urlparse(base_url)
+
+    if parsed.hostname and parsed.hostname.endswith('.local'):
+        resolved_ip = resolve_mdns(parsed.hostname)
+        new_netloc = parsed.netloc.replace(parsed.hostname, resolved_ip)
+        base_url = parsed._replace(netloc=new_netloc).geturl()
+
+    return base_url, parsed.hostname
+
+async def deliver_message(peer: Peer, payload: dict) -> dict:
+    """
+    POSTs a message payload to a peer's inbox and returns the peer's response.
+    When PEER_LINK_ENABLED, the persistent link is tried first and HTTP is the fallback.
+    Content above the blob threshold goes to /inbox/stream as a raw body instead.
+    Records the outcome on the peer's circuit breaker; raises DeliveryError on failure.
+    """
+    try:
+        with tracing.span("resolve", **{"pai.peer": peer.name}):
+            base_url, hostname = _resolve_base_url(peer)
+    except Exception as e:
+        peer.breaker.record_failure()
+        raise DeliveryError(f"mDNS resolution failed: {str(e)}") from e
+
+    large = get_blob_store().should_externalize(payload["content"])
+
+    if settings.PEER_LINK_ENABLED and not large:
+        try:
+            with tracing.span("link.send", **{"pai.peer": peer.name}):
+                result = await peer.link.send(base_url, payload)
+            peer.breaker.record_success()
+            return result
+        except LinkRejected as e:
+            peer.breaker.record_success()
+            raise DeliveryError(f"Link Error: {str(e)}") from e
+        except LinkUnavailable as e:
+            logger.debug(f"Link to {peer.name} unavailable ({e}), falling back to HTTP")
+
+    if large:
+        url = f"{base_url}/inbox/stream"
+        params = {
+            field: payload[field]
+            for field in ("sender", "message_type", "priority", "context_id", "timestamp")
+            if payload.get(field) is not None
+        }
+        request = {"params": params, "content": payload["content"].encode("utf-8"), "timeout": LARGE_MESSAGE_TIMEOUT}
+    else:
+        url = f"{base_url}/inbox"
+        request = {"json": payload, "timeout": 5.0}
+
+    try:
+        with tracing.span("http.post", **{"http.url": url}) as post_span:
+            headers = {
+                "X-PAI-API-Key": peer.api_key.get_secret_value(),
+                "Host": hostname, # Preserve original host header
+                "traceparent": post_span.traceparent
+            }
+            response = await peer.client.post(
+                url, headers=headers, extensions={"trace": tracing.httpx_trace_hook()}, **request
+            )
+            post_span.set("http.status_code", response.status_code)
+            response.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        # A 4xx still means the peer is up; only server errors count against it
+        if e.response.status_code >= 500:
+            peer.breaker.record_failure()
+        else:
+            peer.breaker.record_success()
+        raise DeliveryError(f"HTTP Error: {e.response.status_code}") from e
+    except httpx.RequestError as e:
+        peer.breaker.record_failure()
+        raise DeliveryError(f"Connection Error: {str(e)}") from e
+
+    peer.breaker.record_success()
+    return response.json()
+
+async def _dispatch(repo: MessageRepository, msg_id: str, peer: Peer, payload: dict) -> dict:
+    """
+    Attempts delivery of a stored outbox message to one peer and records the result.
+    While the peer's circuit is open the delivery is left pending for its retry lane.
+    """
+    if not peer.breaker.allow_request():
+        logger.info(f"{peer.name} unavailable, message {msg_id} queued in outbox")
+        return {
+            "status": "queued",
+            "details": f"{peer.name} unavailable; message queued for delivery",
+            "id": msg_id
+        }
+
+    with tracing.span("deliver", trace_id=tracing.message_trace_id(msg_id), **{"pai.message_id": msg_id, "pai.peer": peer.name}) as deliver_span:
+        try:
+            result = await deliver_message(peer, payload)
+        except DeliveryError as e:
+            error_msg = str(e)
+            deliver_span.error = error_msg
+            with tracing.span("db.commit"):
+                await repo.update_delivery_status(msg_id, peer.name, MessageStatus.FAILED, error_msg)
+            logger.error(f"Message {msg_id} to {peer.name} failed: {error_msg}")
+            return {"status": "error", "details": error_msg, "id": msg_id}
+
+        with tracing.span("db.commit"):
+            await repo.update_delivery_status(msg_id, peer.name, MessageStatus.SENT)
+    logger.info(f"Message {msg_id} sent to {peer.name} successfully")
+    return result
+
+# Deliveries started by non-blocking sends; kept referenced until they finish
+_background_dispatches: set[asyncio.Task] = set()
+
+def _dispatch_in_background(repo: MessageRepository, msg_id: str, peer: Peer, payload: dict):
+    task = asyncio.create_task(_dispatch(repo, msg_id, peer, payload))
+    _background_dispatches.add(task)
+    task.add_done_callback(_background_dispatches.discard)
+
+async def wait_for_background_dispatches(timeout: float = 5.0):
+    """
+    Give in-flight non-blocking sends a chance to finish (e.g. before the MCP
+    process exits). Anything unfinished stays pending in the outbox.
+    """
+    if _background_dispatches:
+        await asyncio.wait(set(_background_dispatches), timeout=timeout)
+
+def _queued_result(msg_id: str, peer: Peer) -> dict:
+    return {
+        "status": "queued",
+        "details": f"Delivery to {peer.name} in progress",
+        "id": msg_id,
+        "outbox_id": msg_id
+    }
+
 async def send_to_remote(
     content: str,
     sender: str = settings.SYSTEM_NAME,
     priority: str = "normal",
     message_type: str = "text",
-    context_id: str | None = None
+    context_id: str | None = None,
+    recipient: str | None = None,
+    wait: bool = True
 ) -> dict:
     """
-    Sends a message to the remote PAI instance.
+    Sends a message to a remote PAI instance, routed by recipient name
+    (the default peer when omitted).
     Stores in outbox before sending, updates status after.
-    Resolves mDNS .local addresses before connecting.
+    While the peer's circuit breaker is open the message is left pending in
+    the outbox for the retry queue instead of waiting on the network.
+    With wait=False it returns the outbox ID as soon as the message is stored
+    and delivers in the background.
     """
-    msg_id = str(uuid.uuid4())
+    peer = get_peer_registry().get(recipient)
+    if peer is None:
+        return {"status": "error", "details": f"Unknown recipient: {recipient}"}
+
+    msg_id = new_message_id()
 
     # Get database connection
     db_conn = get_db_connection()
     conn = await db_conn.get_async_connection()
     repo = MessageRepository(conn)
 
-    # Store in outbox with pending status
-    await repo.store_outbox_message(
-        message_id=msg_id,
-        sender=sender,
-        content=content,
-        message_type=message_type,
-        priority=priority,
-        status=MessageStatus.PENDING_SEND,
-        context_id=context_id
-    )
-
-    # Parse URL to get hostname
-    base_url = settings.REMOTE_PAI_URL
-    parsed = urlparse(base_url)
+    with tracing.span("send", trace_id=tracing.message_trace_id(msg_id), **{"pai.message_id": msg_id}):
+        # Store in outbox with pending status
+        with tracing.span("db.commit"):
+            await repo.store_outbox_message(
+                message_id=msg_id,
+                sender=sender,
+                content=content,
+                message_type=message_type,
+                priority=priority,
+                status=MessageStatus.PENDING_SEND,
+                recipients=[peer.name],
+                context_id=context_id
+            )
 
-    # Resolve hostname if it's .local
-    if parsed.hostname and parsed.hostname.endswith('.local'):
-        try:
-            resolved_ip = resolve_mdns(parsed.hostname)
-            new_netloc = parsed.netloc.replace(parsed.hostname, resolved_ip)
-            base_url = parsed._replace(netloc=new_netloc).geturl()
-        except Exception as e:
-            error_msg = f"mDNS resolution failed: {str(e)}"
-            logger.warning(error_msg)
-            await repo.update_outbox_status(msg_id, MessageStatus.FAILED, error_msg)
-            return {"status": "error", "details": error_msg, "id": msg_id}
+        payload = {
+            "sender": sender,
+            "content": content,
+            "priority": priority,
+            "message_type": message_type,
+            "context_id": context_id,
+            "timestamp": _utc_now()
+        }
 
-    url = f"{base_url}/inbox"
+        if not wait:
+            _dispatch_in_background(repo, msg_id, peer, payload)
+            return _queued_result(msg_id, peer)
 
-    payload = {
-        "sender": sender,
-        "content": content,
-        "priority": priority,
-        "message_type": message_type,
-        "context_id": context_id
-    }
+        result = await _dispatch(repo, msg_id, peer, payload)
+    result["outbox_id"] = msg_id  # Add our outbox message ID
+    return result
 
-    headers = {
-        "X-PAI-API-Key": settings.REMOTE_PAI_API_KEY.get_secret_value(),
-        "Host": parsed.hostname # Preserve original host header
-    }
+async def send_batch(
+    messages: list[dict],
+    sender: str = settings.SYSTEM_NAME,
+    wait: bool = True
+) -> list[dict]:
+    """
+    Sends several messages, each a dict with content and optional priority,
+    message_type, context_id and recipient.
+    All are stored in the outbox in one batch and delivered concurrently;
+    results come back in the same order as the input.
+    """
+    registry = get_peer_registry()
+    results: list[dict | None] = [None] * len(messages)
+    batch = []
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(url, json=payload, headers=headers, timeout=5.0)
-            response.raise_for_status()
+    for index, item in enumerate(messages):
+        peer = registry.get(item.get("recipient"))
+        if peer is None:
+            results[index] = {"status": "error", "details": f"Unknown recipient: {item.get('recipient')}"}
+            continue
+        if not item.get("content"):
+            results[index] = {"status": "error", "details": "Content is required"}
+            continue
+        message_type = item.get("message_type", "text")
+        if message_type not in MessageType.__members__.values():
+            results[index] = {"status": "error", "details": f"Item {index}: unknown message_type {message_type!r}"}
+            continue
+        priority = item.get("priority", "normal")
+        if priority not in Priority.__members__.values():
+            results[index] = {"status": "error", "details": f"Item {index}: unknown priority {priority!r}"}
+            continue
+        batch.append((index, peer, {
+            "id": new_message_id(),
+            "sender": sender,
+            "content": item["content"],
+            "message_type": message_type,
+            "priority": priority,
+            "context_id": item.get("context_id"),
+            "recipients": [peer.name]
+        }))
 
-            # Update outbox status to sent
-            await repo.update_outbox_status(msg_id, MessageStatus.SENT)
-            logger.info(f"Message {msg_id} sent successfully")
+    if not batch:
+        return results
 
-            result = response.json()
-            result["outbox_id"] = msg_id  # Add our outbox message ID
-            return result
+    db_conn = get_db_connection()
+    conn = await db_conn.get_async_connection()
+    repo = MessageRepository(conn)
 
-        except httpx.HTTPStatusError as e:
-            error_msg = f"HTTP Error: {e.response.status_code}"
-            await repo.update_outbox_status(msg_id, MessageStatus.FAILED, error_msg)
-            logger.error(f"Message {msg_id} failed: {error_msg}")
-            return {"status": "error", "details": error_msg, "id": msg_id}
+    await repo.store_outbox_messages([record for _, _, record in batch])
+    sent_at = _utc_now()
 
-        except httpx.RequestError as e:
-            error_msg = f"Connection Error: {str(e)}"
-            await repo.update_outbox_status(msg_id, MessageStatus.FAILED, error_msg)
-            logger.error(f"Message {msg_id} failed: {error_msg}")
-            return {"status": "error", "details": error_msg, "id": msg_id}
+    async def dispatch(peer: Peer, record: dict) -> dict:
+        payload = {key: record[key] for key in ("sender", "content", "priority", "message_type", "context_id")}
+        payload["timestamp"] = sent_at
+        if not wait:
+            _dispatch_in_background(repo, record["id"], peer, payload)
+            return _queued_result(record["id"], peer)
+        result = await _dispatch(repo, record["id"], peer, payload)
+        result["outbox_id"] = record["id"]
+        return result
+
+    dispatched = await asyncio.gather(*(dispatch(peer, record) for _, peer, record in batch))
+    for (index, _, _), result in zip(batch, dispatched):
+        results[index] = result
+
+    logger.info(f"Batch of {len(messages)} messages: {len(batch)} stored")
+    return results
 
-async def check_remote_status() -> dict:
+async def get_delivery_status(message_ids: list[str]) -> dict[str, dict]:
+    """Looks up the delivery status of many outbox messages at once."""
+    db_conn = get_db_connection()
+    conn = await db_conn.get_async_connection()
+    repo = MessageRepository(conn)
+    return await repo.get_delivery_statuses(message_ids)
+
+async def broadcast_to_peers(
+    content: str,
+    sender: str = settings.SYSTEM_NAME,
+    priority: str = "normal",
+    message_type: str = "text",
+    context_id: str | None = None,
+    recipients: list[str] | None = None
+) -> dict:
     """
-    Checks the health status of the remote PAI instance.
+    Sends one message to several peers (all configured peers by default).
+    The content is stored once in the outbox and delivered to every peer
+    concurrently; each peer's delivery is tracked and retried independently.
     """
-    base_url = settings.REMOTE_PAI_URL
-    parsed = urlparse(base_url)
-    
-    if parsed.hostname and parsed.hostname.endswith('.local'):
-        resolved_ip = resolve_mdns(parsed.hostname)
-        new_netloc = parsed.netloc.replace(parsed.hostname, resolved_ip)
-        base_url = parsed._replace(netloc=new_netloc).geturl()
-    
+    registry = get_peer_registry()
+    if recipients is None:
+        peers = list(registry)
+    else:
+        peers = [registry.get(name) for name in recipients]
+        unknown = [name for name, peer in zip(recipients, peers) if peer is None]
+        if unknown:
+            return {"status": "error", "details": f"Unknown recipients: {', '.join(unknown)}"}
+        # Drop duplicates while keeping order
+        peers = list({peer.name: peer for peer in peers}.values())
+
+    if not peers:
+        return {"status": "error", "details": "No recipients"}
+
+    msg_id = new_message_id()
+
+    db_conn = get_db_connection()
+    conn = await db_conn.get_async_connection()
+    repo = MessageRepository(conn)
+
+    with tracing.span("send", trace_id=tracing.message_trace_id(msg_id), **{"pai.message_id": msg_id}):
+        with tracing.span("db.commit"):
+            await repo.store_outbox_message(
+                message_id=msg_id,
+                sender=sender,
+                content=content,
+                message_type=message_type,
+                priority=priority,
+                status=MessageStatus.PENDING_SEND,
+                recipients=[peer.name for peer in peers],
+                context_id=context_id
+            )
+
+        payload = {
+            "sender": sender,
+            "content": content,
+            "priority": priority,
+            "message_type": message_type,
+            "context_id": context_id,
+            "timestamp": _utc_now()
+        }
+
+        results = await asyncio.gather(*(_dispatch(repo, msg_id, peer, payload) for peer in peers))
+    deliveries = {peer.name: result for peer, result in zip(peers, results)}
+
+    statuses = {result.get("status") for result in results}
+    if statuses <= {"received"}:
+        status = "sent"
+    elif statuses <= {"error"}:
+        status = "error"
+    elif statuses <= {"queued"}:
+        status = "queued"
+    else:
+        status = "partial"
+
+    logger.info(f"Broadcast {msg_id} to {len(peers)} peers: {status}")
+    return {"status": status, "id": msg_id, "outbox_id": msg_id, "deliveries": deliveries}
+
+async def check_remote_status(recipient: str | None = None) -> dict:
+    """
+    Checks the health status of a remote PAI instance (the default peer when omitted).
+    """
+    peer = get_peer_registry().get(recipient)
+    if peer is None:
+        return {"status": "unknown", "details": f"Unknown recipient: {recipient}"}
+
+    base_url, hostname = _resolve_base_url(peer)
+
     url = f"{base_url}/health"
-    
+
     headers = {
-        "Host": parsed.hostname
+        "Host": hostname
     }
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url, headers=headers, timeout=3.0)
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            return {"status": "offline", "details": str(e)}
+
+    try:
+        response = await peer.client.get(url, headers=headers, timeout=3.0)
+        response.raise_for_status()
+        return response.json()
+    except Exception as e:
+        return {"status": "offline", "details": str(e)}
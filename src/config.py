@@ -1,7 +1,13 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import SecretStr, Field
+from pydantic import BaseModel, SecretStr, Field
+from typing import Literal
 from functools import lru_cache
 
+class PeerConfig(BaseModel):
+    name: str = Field(..., min_length=1, description="Recipient name used for routing (e.g., 'Patterson')")
+    url: str = Field(..., description="Full URL of the peer PAI instance")
+    api_key: SecretStr = Field(..., description="API Key for the peer PAI instance")
+
 class Settings(BaseSettings):
     # System Identity
     SYSTEM_NAME: str = Field(default="Bob", description="Name of the local PAI identity")
@@ -9,14 +15,55 @@ class Settings(BaseSettings):
     # Server Config
     PORT: int = Field(default=8000, description="Port to run the local API server on")
     API_KEY: SecretStr = Field(default=SecretStr("dev-key"), description="Local API Key for authentication")
+    API_KEYS_FILE: str = Field(default="data/api_keys.json", description="JSON file of hashed per-peer API keys, reloaded on change")
+    API_KEYS_RELOAD_INTERVAL: float = Field(default=5.0, description="Seconds between checks of the API key file for changes")
+    API_KEY_RATE: float = Field(default=20.0, description="Default requests per second allowed per key in API_KEYS_FILE")
+    API_KEY_BURST: float = Field(default=40.0, description="Default burst size allowed per key in API_KEYS_FILE")
+    API_KEY_DEFAULT_RATE: float | None = Field(default=None, description="Requests per second allowed on the legacy API_KEY (burst API_KEY_BURST); unlimited when unset")
+
+    # Admission Control (inbound writes)
+    ADMISSION_MAX_IN_FLIGHT: int = Field(default=16, description="Max inbound message writes processed at once")
+    ADMISSION_MAX_QUEUE: int = Field(default=64, description="Max inbound writes waiting for a slot")
+    ADMISSION_NORMAL_QUEUE: int = Field(default=16, description="Queue depth beyond which normal-priority writes are shed")
+    ADMISSION_QUEUE_TIMEOUT: float = Field(default=5.0, description="Seconds a queued write waits before it is shed")
+
+    # Diagnostics
+    LOOP_STALL_THRESHOLD: float = Field(default=0.25, description="Seconds the event loop may be blocked before its stack is captured")
+    LOOP_MONITOR_INTERVAL: float = Field(default=0.1, description="Seconds between event loop heartbeats")
+    PROFILE_MAX_SECONDS: float = Field(default=30.0, description="Longest profiling session the /debug/profile endpoint will run")
+
+    # Tracing
+    TRACE_EXPORTER: Literal["none", "file", "otlp"] = Field(default="none", description="Where finished delivery spans are exported")
+    TRACE_FILE: str = Field(default="logs/traces.jsonl", description="JSON-lines span file for the file exporter")
+    TRACE_OTLP_ENDPOINT: str = Field(default="http://localhost:4318/v1/traces", description="OTLP/HTTP traces endpoint for the otlp exporter")
+    TRACE_EXPORT_INTERVAL: float = Field(default=5.0, description="Seconds between span export batches")
 
     # Remote Config
     REMOTE_PAI_URL: str = Field(default="http://localhost:8000", description="Full URL of the remote PAI instance")
     REMOTE_PAI_API_KEY: SecretStr = Field(default=SecretStr("dev-key"), description="API Key for the remote PAI instance")
+    REMOTE_PAI_NAME: str = Field(default="Patterson", description="Recipient name of the remote PAI instance")
+
+    # Peer Registry (JSON list; when empty a single peer is built from the REMOTE_PAI_* settings)
+    PEERS: list[PeerConfig] = Field(default_factory=list, description="Remote PAI peers; the first one is the default recipient")
+
+    # Remote Health Config
+    CIRCUIT_FAILURE_THRESHOLD: int = Field(default=3, description="Consecutive delivery failures before the circuit opens")
+    CIRCUIT_RESET_TIMEOUT: float = Field(default=30.0, description="Seconds an open circuit waits before allowing a trial request")
+    HEALTH_PROBE_INTERVAL: float = Field(default=10.0, description="Seconds between remote /health probes while the circuit is open")
+
+    # Peer Link Config
+    PEER_LINK_ENABLED: bool = Field(default=False, description="Deliver over a persistent WebSocket link when the peer supports it")
+    PEER_LINK_WINDOW: int = Field(default=32, description="Max unacknowledged messages in flight on a peer link")
+    PEER_LINK_RETRY_INTERVAL: float = Field(default=30.0, description="Seconds to use plain HTTP after a failed link connect")
 
     # Database Config
     DB_PATH: str = Field(default="data/messages.db", description="Path to SQLite database file")
 
+    # Blob Store Config
+    BLOB_DIR: str = Field(default="data/blobs", description="Directory for content-addressed message payloads")
+    BLOB_THRESHOLD: int = Field(default=65536, description="Content larger than this many bytes is stored out of line")
+    BLOB_MAX_SIZE: int = Field(default=64 * 1024 * 1024, description="Largest body accepted by the streaming upload endpoint")
+
     model_config = SettingsConfigDict(
         env_prefix="PAI_",
         env_file=".env",
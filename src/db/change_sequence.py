@@ -0,0 +1,56 @@
+"""
+Change sequence for cheap cache validation.
+
+MessageRepository bumps the sequence after every write it commits. Writes
+made by other processes on the same database (e.g. the MCP bridge storing
+outbox messages) are picked up from the database and WAL files' size and
+mtime. Reading the sequence therefore never queries SQLite, and an
+unchanged value means nothing was written since the last read.
+"""
+
+import os
+import secrets
+from src.config import get_settings
+
+class ChangeSequence:
+    """Monotonically increasing counter of database writes."""
+
+    def __init__(self, watch_paths: list[str]):
+        self.watch_paths = watch_paths
+        # Distinguishes sequences across restarts, so old ETags never match
+        self.epoch = secrets.token_hex(4)
+        self._value = 0
+        self._fingerprint = self._stat()
+
+    def _stat(self) -> tuple:
+        fingerprint = []
+        for path in self.watch_paths:
+            try:
+                st = os.stat(path)
+                fingerprint.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                fingerprint.append(None)
+        return tuple(fingerprint)
+
+    def bump(self):
+        self._value += 1
+
+    @property
+    def value(self) -> int:
+        fingerprint = self._stat()
+        if fingerprint != self._fingerprint:
+            # Written by someone else (or us; a spare bump is harmless)
+            self._fingerprint = fingerprint
+            self._value += 1
+        return self._value
+
+# Global singleton instance
+_change_sequence: ChangeSequence | None = None
+
+def get_change_sequence() -> ChangeSequence:
+    """Get the global change sequence for the configured database."""
+    global _change_sequence
+    if _change_sequence is None:
+        db_path = get_settings().DB_PATH
+        _change_sequence = ChangeSequence([db_path, f"{db_path}-wal"])
+    return _change_sequence
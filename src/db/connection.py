@@ -79,6 +79,7 @@ async def get_async_db() -> AsyncGenerator[aiosqlite.Connection, None]:
     try:
         yield connection
     except Exception as e:
+        # The connection is shared; repository transactions roll back their
+        # own writes under the write lock, so nothing is undone here
         logger.error(f"Database error in request: {e}")
-        await connection.rollback()
         raise
@@ -0,0 +1,356 @@
+"""Schema migrations tracked with SQLite's user_version pragma."""
+
+import secrets
+import sqlite3
+from datetime import datetime, timezone
+from typing import Callable
+from src.config import get_settings
+from src.db.models import CREATE_TABLES_SQL
+from src.ids import uuid7_from_parts
+from src.logging_config import logger
+
+def _add_deliveries(conn: sqlite3.Connection):
+    """Per-recipient delivery state, so one outbox row can fan out to many peers."""
+    conn.execute(
+        """
+        CREATE TABLE deliveries (
+            message_id TEXT NOT NULL REFERENCES messages(id) ON DELETE CASCADE,
+            recipient TEXT NOT NULL,
+            status TEXT NOT NULL CHECK(status IN ('pending', 'sent', 'failed')),
+            retry_count INTEGER NOT NULL DEFAULT 0,
+            last_retry_at TIMESTAMP,
+            error_message TEXT,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (message_id, recipient)
+        )
+        """
+    )
+    # Per-peer retry lanes
+    conn.execute(
+        """
+        CREATE INDEX idx_deliveries_lane
+        ON deliveries(recipient, status, retry_count)
+        WHERE status IN ('pending', 'failed')
+        """
+    )
+
+    # Roll delivery state up to the outbox message: pending while any delivery
+    # is pending, failed if any failed, otherwise sent
+    conn.execute(
+        """
+        CREATE TRIGGER deliveries_rollup
+        AFTER UPDATE OF status ON deliveries
+        FOR EACH ROW
+        BEGIN
+            UPDATE messages
+            SET status = (
+                    SELECT CASE
+                        WHEN SUM(status = 'pending') > 0 THEN 'pending'
+                        WHEN SUM(status = 'failed') > 0 THEN 'failed'
+                        ELSE 'sent'
+                    END
+                    FROM deliveries WHERE message_id = NEW.message_id
+                ),
+                error_message = COALESCE(NEW.error_message, error_message)
+            WHERE id = NEW.message_id;
+        END
+        """
+    )
+
+    # Existing outbox rows were all addressed to the single configured remote
+    settings = get_settings()
+    recipient = settings.PEERS[0].name if settings.PEERS else settings.REMOTE_PAI_NAME
+    conn.execute(
+        """
+        INSERT INTO deliveries (message_id, recipient, status, retry_count, last_retry_at, error_message)
+        SELECT id, ?, status, retry_count, last_retry_at, error_message
+        FROM messages
+        WHERE direction = 'outbox'
+        """,
+        (recipient,)
+    )
+
+    # Retries are driven from deliveries now
+    conn.execute("DROP INDEX IF EXISTS idx_outbox_retry")
+
+def _add_blob_refs(conn: sqlite3.Connection):
+    """Columns for content stored out of line in the blob store (content is '' on those rows)."""
+    conn.execute("ALTER TABLE messages ADD COLUMN blob_sha256 TEXT")
+    conn.execute("ALTER TABLE messages ADD COLUMN content_size INTEGER")
+
+def _add_inbox_leases(conn: sqlite3.Connection):
+    """Claim/ack state so local consumers can work through the inbox as a queue."""
+    conn.execute("ALTER TABLE messages ADD COLUMN lease_id TEXT")
+    conn.execute("ALTER TABLE messages ADD COLUMN lease_expires_at REAL")  # Unix time
+    conn.execute("ALTER TABLE messages ADD COLUMN delivery_count INTEGER NOT NULL DEFAULT 0")
+    conn.execute("ALTER TABLE messages ADD COLUMN acked_at TIMESTAMP")
+
+    # Only unacknowledged inbox rows are ever scanned by a claim
+    conn.execute(
+        """
+        CREATE INDEX idx_inbox_unacked
+        ON messages(message_type, priority, lease_expires_at)
+        WHERE direction = 'inbox' AND acked_at IS NULL
+        """
+    )
+
+    # Existing rows were handled by polling consumers; start the queue empty
+    conn.execute("UPDATE messages SET acked_at = created_at WHERE direction = 'inbox'")
+
+def _time_ordered_ids(conn: sqlite3.Connection):
+    """
+    Rewrite existing message IDs as UUIDv7s of their creation time, so ID
+    order is creation order for every row and IDs work as history cursors.
+    """
+    rows = conn.execute("SELECT id, created_at FROM messages ORDER BY created_at, rowid").fetchall()
+    mapping = []
+    last_ms, counter = -1, 0
+    for old_id, created_at in rows:
+        unix_ms = int(datetime.fromisoformat(created_at).replace(tzinfo=timezone.utc).timestamp() * 1000)
+        if unix_ms <= last_ms:
+            # Same second as the previous row: keep insertion order with the counter
+            unix_ms, counter = last_ms, counter + 1
+            if counter > 0xFFF:
+                unix_ms, counter = unix_ms + 1, 0
+        else:
+            counter = 0
+        last_ms = unix_ms
+        mapping.append((old_id, str(uuid7_from_parts(unix_ms, counter, secrets.randbits(62)))))
+
+    conn.execute("CREATE TEMP TABLE id_map (old_id TEXT PRIMARY KEY, new_id TEXT NOT NULL)")
+    conn.executemany("INSERT INTO id_map VALUES (?, ?)", mapping)
+
+    # Keep updated_at as it was; the trigger is recreated unchanged below
+    conn.execute("DROP TRIGGER update_message_timestamp")
+    conn.execute(
+        """
+        UPDATE deliveries
+        SET message_id = (SELECT new_id FROM id_map WHERE old_id = deliveries.message_id)
+        WHERE message_id IN (SELECT old_id FROM id_map)
+        """
+    )
+    conn.execute(
+        """
+        UPDATE messages
+        SET id = (SELECT new_id FROM id_map WHERE old_id = messages.id)
+        WHERE id IN (SELECT old_id FROM id_map)
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER update_message_timestamp
+        AFTER UPDATE ON messages
+        FOR EACH ROW
+        BEGIN
+            UPDATE messages SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+        END
+        """
+    )
+    conn.execute("DROP TABLE id_map")
+
+    # History is ordered by ID now
+    conn.execute("DROP INDEX IF EXISTS idx_messages_created_at")
+    logger.info(f"Rewrote {len(mapping)} message IDs as time-ordered IDs")
+
+def _compact_messages(conn: sqlite3.Connection):
+    """
+    Rebuild messages with small-integer enum columns (codes in src.db.models)
+    and senders interned in their own table, keeping only the indexes
+    MessageRepository queries use. Rowids are kept, so subscriber cursors
+    stay valid. The retry columns, unused since retries moved to
+    deliveries, are dropped.
+    """
+    # Both triggers name messages and would block the rename below
+    conn.execute("DROP TRIGGER deliveries_rollup")
+    conn.execute("DROP TRIGGER update_message_timestamp")
+
+    conn.execute("CREATE TABLE senders (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+    conn.execute("INSERT INTO senders (name) SELECT sender FROM messages GROUP BY sender ORDER BY MIN(rowid)")
+
+    conn.execute(
+        """
+        CREATE TABLE messages_compact (
+            id TEXT PRIMARY KEY,
+            sender_id INTEGER NOT NULL REFERENCES senders(id),
+            content TEXT NOT NULL,
+            message_type INTEGER NOT NULL DEFAULT 0 CHECK(message_type IN (0, 1, 2)),
+            priority INTEGER NOT NULL DEFAULT 0 CHECK(priority IN (0, 1, 2)),
+            context_id TEXT,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            direction INTEGER NOT NULL CHECK(direction IN (0, 1)),
+            status INTEGER CHECK(status IN (0, 1, 2, 3)),
+            error_message TEXT,
+            blob_sha256 TEXT,
+            content_size INTEGER,
+            lease_id TEXT,
+            lease_expires_at REAL,
+            delivery_count INTEGER NOT NULL DEFAULT 0,
+            acked_at TIMESTAMP
+        )
+        """
+    )
+    conn.execute(
+        """
+        INSERT INTO messages_compact (
+            rowid, id, sender_id, content, message_type, priority, context_id, created_at, updated_at,
+            direction, status, error_message, blob_sha256, content_size,
+            lease_id, lease_expires_at, delivery_count, acked_at
+        )
+        SELECT m.rowid, m.id, s.id, m.content,
+               CASE m.message_type WHEN 'text' THEN 0 WHEN 'task' THEN 1 WHEN 'query' THEN 2 END,
+               CASE m.priority WHEN 'normal' THEN 0 WHEN 'high' THEN 1 WHEN 'urgent' THEN 2 END,
+               m.context_id, m.created_at, m.updated_at,
+               CASE m.direction WHEN 'inbox' THEN 0 WHEN 'outbox' THEN 1 END,
+               CASE m.status WHEN 'received' THEN 0 WHEN 'pending' THEN 1 WHEN 'sent' THEN 2 WHEN 'failed' THEN 3 END,
+               m.error_message, m.blob_sha256, m.content_size,
+               m.lease_id, m.lease_expires_at, m.delivery_count, m.acked_at
+        FROM messages m JOIN senders s ON s.name = m.sender
+        ORDER BY m.rowid
+        """
+    )
+    conn.execute("DROP TABLE messages")
+    conn.execute("ALTER TABLE messages_compact RENAME TO messages")
+
+    # Direction and status were never filtered on alone; history by sender and
+    # threads look up on these. Adding id would make them ordered but triple their size.
+    conn.execute("CREATE INDEX idx_messages_sender ON messages(sender_id)")
+    conn.execute("CREATE INDEX idx_messages_context_id ON messages(context_id)")
+    conn.execute(
+        """
+        CREATE INDEX idx_inbox_unacked
+        ON messages(message_type, priority, lease_expires_at)
+        WHERE direction = 0 AND acked_at IS NULL
+        """
+    )
+
+    conn.execute(
+        """
+        CREATE TRIGGER update_message_timestamp
+        AFTER UPDATE ON messages
+        FOR EACH ROW
+        BEGIN
+            UPDATE messages SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER deliveries_rollup
+        AFTER UPDATE OF status ON deliveries
+        FOR EACH ROW
+        BEGIN
+            UPDATE messages
+            SET status = (
+                    SELECT CASE
+                        WHEN SUM(status = 'pending') > 0 THEN 1
+                        WHEN SUM(status = 'failed') > 0 THEN 3
+                        ELSE 2
+                    END
+                    FROM deliveries WHERE message_id = NEW.message_id
+                ),
+                error_message = COALESCE(NEW.error_message, error_message)
+            WHERE id = NEW.message_id;
+        END
+        """
+    )
+
+def _add_message_stats(conn: sqlite3.Connection):
+    """
+    Hourly message counts per sender, direction and type, kept up to date by
+    triggers, so aggregates read a bounded number of rollup rows instead of
+    scanning messages. Only outbox messages can fail, so `failed` counts
+    outbox messages whose status is currently failed.
+    """
+    conn.execute(
+        """
+        CREATE TABLE message_stats (
+            bucket INTEGER NOT NULL,  -- Unix time of the start of the hour (UTC)
+            sender_id INTEGER NOT NULL REFERENCES senders(id),
+            direction INTEGER NOT NULL,
+            message_type INTEGER NOT NULL,
+            messages INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (bucket, sender_id, direction, message_type)
+        ) WITHOUT ROWID
+        """
+    )
+
+    conn.execute(
+        """
+        CREATE TRIGGER message_stats_insert
+        AFTER INSERT ON messages
+        FOR EACH ROW
+        BEGIN
+            INSERT INTO message_stats (bucket, sender_id, direction, message_type, messages, failed)
+            VALUES (CAST(strftime('%s', NEW.created_at) AS INTEGER) / 3600 * 3600,
+                    NEW.sender_id, NEW.direction, NEW.message_type, 1, NEW.status IS 3)
+            ON CONFLICT DO UPDATE SET messages = messages + 1, failed = failed + excluded.failed;
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER message_stats_status
+        AFTER UPDATE OF status ON messages
+        FOR EACH ROW
+        WHEN (NEW.status IS 3) != (OLD.status IS 3)
+        BEGIN
+            UPDATE message_stats
+            SET failed = failed + (NEW.status IS 3) - (OLD.status IS 3)
+            WHERE bucket = CAST(strftime('%s', NEW.created_at) AS INTEGER) / 3600 * 3600
+              AND sender_id = NEW.sender_id AND direction = NEW.direction AND message_type = NEW.message_type;
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER message_stats_delete
+        AFTER DELETE ON messages
+        FOR EACH ROW
+        BEGIN
+            UPDATE message_stats
+            SET messages = messages - 1, failed = failed - (OLD.status IS 3)
+            WHERE bucket = CAST(strftime('%s', OLD.created_at) AS INTEGER) / 3600 * 3600
+              AND sender_id = OLD.sender_id AND direction = OLD.direction AND message_type = OLD.message_type;
+        END
+        """
+    )
+
+    conn.execute(
+        """
+        INSERT INTO message_stats (bucket, sender_id, direction, message_type, messages, failed)
+        SELECT CAST(strftime('%s', created_at) AS INTEGER) / 3600 * 3600, sender_id, direction, message_type,
+               COUNT(*), SUM(status IS 3)
+        FROM messages
+        GROUP BY 1, 2, 3, 4
+        """
+    )
+
+# Applied in order; entry N upgrades a database from user_version N to N + 1
+MIGRATIONS: list[Callable[[sqlite3.Connection], None]] = [
+    _add_deliveries,
+    _add_blob_refs,
+    _add_inbox_leases,
+    _time_ordered_ids,
+    _compact_messages,
+    _add_message_stats,
+]
+
+def migrate(conn: sqlite3.Connection):
+    """Create the base schema if needed and apply any pending migrations."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version == 0:
+        # The base schema is version 0; later versions have reshaped it
+        conn.executescript(CREATE_TABLES_SQL)
+
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        try:
+            conn.execute("BEGIN")
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        logger.info(f"Applied database migration {number}: {migration.__name__}")
@@ -22,6 +22,13 @@ class MessageDirection(str, Enum):
     INBOX = "inbox"
     OUTBOX = "outbox"
 
+# On-disk codes for the enum columns of the compact messages table.
+# Priority codes grow with urgency, so ORDER BY priority DESC is most urgent first.
+MESSAGE_TYPE_CODES = {MessageType.TEXT: 0, MessageType.TASK: 1, MessageType.QUERY: 2}
+PRIORITY_CODES = {Priority.NORMAL: 0, Priority.HIGH: 1, Priority.URGENT: 2}
+STATUS_CODES = {MessageStatus.RECEIVED: 0, MessageStatus.PENDING_SEND: 1, MessageStatus.SENT: 2, MessageStatus.FAILED: 3}
+DIRECTION_CODES = {MessageDirection.INBOX: 0, MessageDirection.OUTBOX: 1}
+
 # Database initialization DDL
 CREATE_TABLES_SQL = """
 CREATE TABLE IF NOT EXISTS messages (
@@ -46,12 +53,8 @@ CREATE INDEX IF NOT EXISTS idx_messages_sender ON messages(sender);
 CREATE INDEX IF NOT EXISTS idx_messages_context_id ON messages(context_id);
 CREATE INDEX IF NOT EXISTS idx_messages_direction ON messages(direction);
 CREATE INDEX IF NOT EXISTS idx_messages_status ON messages(status);
-CREATE INDEX IF NOT EXISTS idx_messages_created_at ON messages(created_at DESC);
-
--- Composite index for outbox retry queries
-CREATE INDEX IF NOT EXISTS idx_outbox_retry
-ON messages(direction, status, retry_count)
-WHERE direction = 'outbox' AND status IN ('pending', 'failed');
+-- idx_messages_created_at and idx_outbox_retry were part of this schema; later
+-- migrations drop them, so they are no longer created here
 
 -- Trigger to update updated_at on row changes
 CREATE TRIGGER IF NOT EXISTS update_message_timestamp
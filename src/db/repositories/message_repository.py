@@ -1,16 +1,108 @@
 """Message repository for database operations."""
 
 import aiosqlite
-from typing import Optional
+import asyncio
+import time
+import uuid
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
 from datetime import datetime, timezone
-from src.db.models import MessageDirection, MessageStatus
+from src.blob_store import BlobStore, get_blob_store
+from src.db.change_sequence import get_change_sequence
+from src.db.models import (
+    DIRECTION_CODES,
+    MESSAGE_TYPE_CODES,
+    PRIORITY_CODES,
+    STATUS_CODES,
+    MessageDirection,
+    MessageStatus,
+)
 from src.logging_config import logger
 
+def _decode(column: str, codes: dict, table: str = "m") -> str:
+    """SQL turning an enum column back into its text value."""
+    cases = " ".join(f"WHEN {code} THEN '{member.value}'" for member, code in codes.items())
+    return f"CASE {table}.{column} {cases} END AS {column}"
+
+# Message rows as the API sees them: enum codes and sender IDs decoded to text.
+# Queries select these FROM messages m JOIN senders s, and filter on the raw
+# m.* columns (with encoded values) so the indexes apply.
+_MESSAGE_COLUMNS = ", ".join([
+    "m.id", "s.name AS sender", "m.content",
+    _decode("message_type", MESSAGE_TYPE_CODES), _decode("priority", PRIORITY_CODES),
+    "m.context_id", "m.created_at", "m.updated_at",
+    _decode("direction", DIRECTION_CODES), _decode("status", STATUS_CODES),
+    "m.error_message", "m.blob_sha256", "m.content_size",
+    "m.lease_id", "m.lease_expires_at", "m.delivery_count", "m.acked_at",
+])
+_FROM_MESSAGES = "FROM messages m JOIN senders s ON s.id = m.sender_id"
+
+# The async connection is shared by every request. A transaction on it must not
+# interleave with statements from other requests, so all repository writes on
+# a connection take its lock (one per event loop, as asyncio locks are bound to one).
+_write_locks: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+def _write_lock(conn: aiosqlite.Connection) -> asyncio.Lock:
+    locks = _write_locks.setdefault(conn, weakref.WeakKeyDictionary())
+    return locks.setdefault(asyncio.get_running_loop(), asyncio.Lock())
+
+_INSERT_MESSAGE = """
+    INSERT INTO messages (id, sender_id, content, message_type, priority, context_id, direction, status,
+                          error_message, blob_sha256, content_size)
+    VALUES (?, (SELECT id FROM senders WHERE name = ?), ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
 class MessageRepository:
     """Repository for message CRUD operations."""
 
-    def __init__(self, connection: aiosqlite.Connection):
+    def __init__(self, connection: aiosqlite.Connection, blobs: Optional[BlobStore] = None):
         self.conn = connection
+        self.blobs = blobs or get_blob_store()
+
+    @asynccontextmanager
+    async def _transaction(self) -> AsyncIterator[None]:
+        """
+        Run the enclosed writes as one transaction: committed together, or
+        rolled back together if any of them fails. On commit, bumps the
+        change sequence that validates cached reads.
+        """
+        async with _write_lock(self.conn):
+            await self.conn.execute("BEGIN")
+            try:
+                yield
+            except BaseException:
+                await self.conn.rollback()
+                raise
+            await self.conn.commit()
+        get_change_sequence().bump()
+
+    async def _intern_senders(self, names: list[str]):
+        """Make sure every sender name has a row in senders."""
+        await self.conn.executemany(
+            "INSERT INTO senders (name) VALUES (?) ON CONFLICT(name) DO NOTHING",
+            [(name,) for name in dict.fromkeys(names)]
+        )
+
+    async def _externalize(self, content: str) -> tuple[str, Optional[str], Optional[int]]:
+        """
+        Move content above the blob threshold out of line.
+        Returns (inline content, blob digest, content size).
+        """
+        if not self.blobs.should_externalize(content):
+            return content, None, None
+        data = content.encode("utf-8")
+        digest = await asyncio.to_thread(self.blobs.put, data)
+        return "", digest, len(data)
+
+    async def _externalize_batch(self, messages: list[dict]) -> list[tuple[str, Optional[str], Optional[int]]]:
+        return [await self._externalize(m["content"]) for m in messages]
+
+    async def load_content(self, row: dict) -> dict:
+        """Fill in `content` for a row whose payload is stored out of line."""
+        if row.get("blob_sha256"):
+            row["content"] = await asyncio.to_thread(self.blobs.read_text, row["blob_sha256"])
+        return row
 
     async def store_inbox_message(
         self,
@@ -19,21 +111,76 @@ class MessageRepository:
         content: str,
         message_type: str,
         priority: str,
-        context_id: Optional[str] = None
+        context_id: Optional[str] = None,
+        blob_sha256: Optional[str] = None,
+        content_size: Optional[int] = None
     ) -> dict:
-        """Store a received message in the inbox."""
-        async with self.conn.execute(
-            """
-            INSERT INTO messages (id, sender, content, message_type, priority, context_id, direction, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (message_id, sender, content, message_type, priority, context_id,
-             MessageDirection.INBOX.value, MessageStatus.RECEIVED.value)
-        ):
-            await self.conn.commit()
+        """
+        Store a received message in the inbox.
+        The returned cursor (the row's rowid) orders inbox messages for subscribers.
+        Pass blob_sha256 and content_size for content already in the blob store.
+        """
+        if blob_sha256 is None:
+            content, blob_sha256, content_size = await self._externalize(content)
+        else:
+            content = ""
+
+        async with self._transaction():
+            await self._intern_senders([sender])
+            async with self.conn.execute(
+                _INSERT_MESSAGE,
+                (message_id, sender, content, MESSAGE_TYPE_CODES[message_type], PRIORITY_CODES[priority], context_id,
+                 DIRECTION_CODES[MessageDirection.INBOX], STATUS_CODES[MessageStatus.RECEIVED], None,
+                 blob_sha256, content_size)
+            ) as cursor:
+                row_cursor = cursor.lastrowid
 
         logger.debug(f"Stored inbox message: {message_id} from {sender}")
-        return {"id": message_id, "status": "stored"}
+        return {
+            "id": message_id,
+            "status": "stored",
+            "cursor": row_cursor,
+            "blob_sha256": blob_sha256,
+            "content_size": content_size
+        }
+
+    async def store_inbox_messages(self, messages: list[dict]) -> list[dict]:
+        """
+        Store a batch of received messages in one round-trip and one
+        transaction: if any message fails, none are stored.
+        Each dict carries id, sender, content, message_type, priority and context_id.
+        Returns what store_inbox_message returns for each message, in input order.
+        """
+        stored = await self._externalize_batch(messages)
+        async with self._transaction():
+            await self._intern_senders([m["sender"] for m in messages])
+            await self.conn.executemany(
+                _INSERT_MESSAGE,
+                [
+                    (m["id"], m["sender"], content, MESSAGE_TYPE_CODES[m["message_type"]], PRIORITY_CODES[m["priority"]],
+                     m["context_id"], DIRECTION_CODES[MessageDirection.INBOX], STATUS_CODES[MessageStatus.RECEIVED], None,
+                     blob_sha256, content_size)
+                    for m, (content, blob_sha256, content_size) in zip(messages, stored)
+                ]
+            )
+
+        cursors: dict[str, int] = {}
+        ids = [m["id"] for m in messages]
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            async with self.conn.execute(
+                f"SELECT rowid, id FROM messages WHERE id IN ({placeholders})",
+                chunk
+            ) as cursor:
+                for row in await cursor.fetchall():
+                    cursors[row[1]] = row[0]
+
+        logger.debug(f"Stored {len(messages)} inbox messages")
+        return [
+            {"id": msg_id, "status": "stored", "cursor": cursors[msg_id], "blob_sha256": blob_sha256, "content_size": content_size}
+            for msg_id, (_, blob_sha256, content_size) in zip(ids, stored)
+        ]
 
     async def store_outbox_message(
         self,
@@ -43,104 +190,412 @@ class MessageRepository:
         message_type: str,
         priority: str,
         status: MessageStatus,
+        recipients: list[str],
         context_id: Optional[str] = None,
         error_message: Optional[str] = None
     ) -> dict:
-        """Store an outgoing message in the outbox."""
-        async with self.conn.execute(
-            """
-            INSERT INTO messages (id, sender, content, message_type, priority, context_id, direction, status, error_message)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (message_id, sender, content, message_type, priority, context_id,
-             MessageDirection.OUTBOX.value, status.value, error_message)
-        ):
-            await self.conn.commit()
+        """
+        Store an outgoing message in the outbox.
+        Content is stored once, with one delivery row per recipient, in one transaction.
+        """
+        content, blob_sha256, content_size = await self._externalize(content)
+        async with self._transaction():
+            await self._intern_senders([sender])
+            await self.conn.execute(
+                _INSERT_MESSAGE,
+                (message_id, sender, content, MESSAGE_TYPE_CODES[message_type], PRIORITY_CODES[priority], context_id,
+                 DIRECTION_CODES[MessageDirection.OUTBOX], STATUS_CODES[status], error_message, blob_sha256, content_size)
+            )
+            await self.conn.executemany(
+                """
+                INSERT INTO deliveries (message_id, recipient, status, error_message)
+                VALUES (?, ?, ?, ?)
+                """,
+                [(message_id, recipient, status.value, error_message) for recipient in recipients]
+            )
 
-        logger.debug(f"Stored outbox message: {message_id} with status {status.value}")
+        logger.debug(f"Stored outbox message: {message_id} for {recipients} with status {status.value}")
         return {"id": message_id, "status": status.value}
 
-    async def update_outbox_status(
+    async def store_outbox_messages(self, messages: list[dict]) -> list[str]:
+        """
+        Store a batch of pending outgoing messages with two round-trips
+        instead of two per message, in one transaction: messages and their
+        deliveries are stored together or not at all. Each dict carries id,
+        sender, content, message_type, priority, context_id and recipients.
+        """
+        stored = await self._externalize_batch(messages)
+        async with self._transaction():
+            await self._intern_senders([m["sender"] for m in messages])
+            await self.conn.executemany(
+                _INSERT_MESSAGE,
+                [
+                    (m["id"], m["sender"], content, MESSAGE_TYPE_CODES[m["message_type"]], PRIORITY_CODES[m["priority"]],
+                     m["context_id"], DIRECTION_CODES[MessageDirection.OUTBOX], STATUS_CODES[MessageStatus.PENDING_SEND],
+                     None, blob_sha256, content_size)
+                    for m, (content, blob_sha256, content_size) in zip(messages, stored)
+                ]
+            )
+            await self.conn.executemany(
+                """
+                INSERT INTO deliveries (message_id, recipient, status)
+                VALUES (?, ?, ?)
+                """,
+                [
+                    (m["id"], recipient, MessageStatus.PENDING_SEND.value)
+                    for m in messages for recipient in m["recipients"]
+                ]
+            )
+
+        logger.debug(f"Stored {len(messages)} outbox messages")
+        return [m["id"] for m in messages]
+
+    async def update_delivery_status(
         self,
         message_id: str,
+        recipient: str,
         status: MessageStatus,
         error_message: Optional[str] = None
     ):
-        """Update the status of an outbox message."""
-        await self.conn.execute(
-            """
-            UPDATE messages
-            SET status = ?, error_message = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE id = ? AND direction = 'outbox'
-            """,
-            (status.value, error_message, message_id)
-        )
-        await self.conn.commit()
-        logger.debug(f"Updated message {message_id} to status {status.value}")
-
-    async def increment_retry_count(self, message_id: str):
-        """Increment retry count and update last_retry_at timestamp."""
-        await self.conn.execute(
-            """
-            UPDATE messages
-            SET retry_count = retry_count + 1,
-                last_retry_at = CURRENT_TIMESTAMP,
-                updated_at = CURRENT_TIMESTAMP
-            WHERE id = ? AND direction = 'outbox'
-            """,
-            (message_id,)
-        )
-        await self.conn.commit()
-        logger.debug(f"Incremented retry count for message {message_id}")
+        """
+        Update the status of one recipient's delivery.
+        The deliveries_rollup trigger keeps the outbox message status in sync.
+        """
+        async with self._transaction():
+            await self.conn.execute(
+                """
+                UPDATE deliveries
+                SET status = ?, error_message = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE message_id = ? AND recipient = ?
+                """,
+                (status.value, error_message, message_id, recipient)
+            )
+        logger.debug(f"Updated message {message_id} for {recipient} to status {status.value}")
 
-    async def get_pending_outbox_messages(self, max_retries: int = 3) -> list[dict]:
+    async def increment_retry_count(self, message_id: str, recipient: str):
+        """Increment a delivery's retry count and update last_retry_at timestamp."""
+        async with self._transaction():
+            await self.conn.execute(
+                """
+                UPDATE deliveries
+                SET retry_count = retry_count + 1,
+                    last_retry_at = CURRENT_TIMESTAMP,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE message_id = ? AND recipient = ?
+                """,
+                (message_id, recipient)
+            )
+        logger.debug(f"Incremented retry count for message {message_id} to {recipient}")
+
+    async def get_pending_outbox_messages(self, recipient: str, max_retries: int = 3) -> list[dict]:
         """
-        Get all outbox messages that need to be sent or retried.
-        Excludes messages that have exceeded max retry count.
+        Get the outbox messages one recipient still needs to receive.
+        Excludes deliveries that have exceeded max retry count.
+        Out-of-line content is loaded, since it is about to be resent.
         """
         async with self.conn.execute(
-            """
-            SELECT * FROM messages
-            WHERE direction = 'outbox'
-              AND status IN ('pending', 'failed')
-              AND retry_count < ?
-            ORDER BY priority DESC, created_at ASC
+            f"""
+            SELECT m.id, s.name AS sender, m.content, m.blob_sha256,
+                   {_decode("message_type", MESSAGE_TYPE_CODES)}, {_decode("priority", PRIORITY_CODES)},
+                   m.context_id, m.created_at,
+                   d.recipient, d.status, d.retry_count, d.last_retry_at, d.error_message
+            FROM deliveries d
+            JOIN messages m ON m.id = d.message_id
+            JOIN senders s ON s.id = m.sender_id
+            WHERE d.recipient = ?
+              AND d.status IN ('pending', 'failed')
+              AND d.retry_count < ?
+            ORDER BY m.priority DESC, m.id ASC
             """,
-            (max_retries,)
+            (recipient, max_retries)
         ) as cursor:
             rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+        return [await self.load_content(dict(row)) for row in rows]
 
     async def get_message_history(
         self,
         limit: int = 100,
         sender: Optional[str] = None,
-        direction: Optional[MessageDirection] = None
+        direction: Optional[MessageDirection] = None,
+        before: Optional[str] = None
     ) -> list[dict]:
-        """Get message history with optional filtering."""
-        query = "SELECT * FROM messages WHERE 1=1"
+        """
+        Get message history with optional filtering, newest first.
+        IDs are time-ordered, so the last ID of a page is the `before` cursor for the next.
+        """
+        query = f"SELECT {_MESSAGE_COLUMNS} {_FROM_MESSAGES} WHERE 1=1"
         params = []
 
+        if before:
+            query += " AND m.id < ?"
+            params.append(before)
+
         if sender:
-            query += " AND sender = ?"
+            query += " AND s.name = ?"
             params.append(sender)
 
         if direction:
-            query += " AND direction = ?"
-            params.append(direction.value)
+            query += " AND m.direction = ?"
+            params.append(DIRECTION_CODES[direction])
 
-        query += " ORDER BY created_at DESC LIMIT ?"
+        query += " ORDER BY m.id DESC LIMIT ?"
         params.append(limit)
 
         async with self.conn.execute(query, params) as cursor:
             rows = await cursor.fetchall()
             return [dict(row) for row in rows]
 
+    async def get_delivery_statuses(self, message_ids: list[str]) -> dict[str, dict]:
+        """
+        Get the status of many outbox messages, with their per-recipient
+        deliveries, in one query per chunk of IDs. Unknown IDs are omitted.
+        """
+        statuses: dict[str, dict] = {}
+        chunk_size = 500  # Stay well below SQLite's bound-parameter limit
+
+        for start in range(0, len(message_ids), chunk_size):
+            chunk = message_ids[start:start + chunk_size]
+            placeholders = ", ".join("?" for _ in chunk)
+            async with self.conn.execute(
+                f"""
+                SELECT m.id, {_decode("status", STATUS_CODES)}, m.error_message, m.updated_at,
+                       d.recipient, d.status AS delivery_status, d.retry_count,
+                       d.error_message AS delivery_error
+                FROM messages m
+                LEFT JOIN deliveries d ON d.message_id = m.id
+                WHERE m.id IN ({placeholders}) AND m.direction = ?
+                """,
+                [*chunk, DIRECTION_CODES[MessageDirection.OUTBOX]]
+            ) as cursor:
+                async for row in cursor:
+                    entry = statuses.setdefault(row["id"], {
+                        "id": row["id"],
+                        "status": row["status"],
+                        "error_message": row["error_message"],
+                        "updated_at": row["updated_at"],
+                        "deliveries": []
+                    })
+                    if row["recipient"] is not None:
+                        entry["deliveries"].append({
+                            "recipient": row["recipient"],
+                            "status": row["delivery_status"],
+                            "retry_count": row["retry_count"],
+                            "error_message": row["delivery_error"]
+                        })
+
+        return statuses
+
+    async def get_thread(self, context_id: str, limit: int = 100) -> list[dict]:
+        """Get the messages sharing a context ID in both directions, oldest first."""
+        async with self.conn.execute(
+            f"""
+            SELECT {_MESSAGE_COLUMNS} {_FROM_MESSAGES}
+            WHERE m.context_id = ?
+            ORDER BY m.id ASC
+            LIMIT ?
+            """,
+            (context_id, limit)
+        ) as cursor:
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+
     async def get_message_by_id(self, message_id: str) -> Optional[dict]:
         """Retrieve a specific message by ID."""
         async with self.conn.execute(
-            "SELECT * FROM messages WHERE id = ?",
+            f"SELECT {_MESSAGE_COLUMNS} {_FROM_MESSAGES} WHERE m.id = ?",
             (message_id,)
         ) as cursor:
             row = await cursor.fetchone()
             return dict(row) if row else None
+
+    async def get_inbox_since(
+        self,
+        cursor: int,
+        limit: int = 100,
+        sender: Optional[str] = None,
+        message_type: Optional[str] = None
+    ) -> list[dict]:
+        """
+        Get inbox messages stored after a cursor, oldest first.
+        Used by subscribers to catch up without gaps after reconnecting.
+        """
+        query = f"SELECT m.rowid AS cursor, {_MESSAGE_COLUMNS} {_FROM_MESSAGES} WHERE m.rowid > ? AND m.direction = ?"
+        params: list = [cursor, DIRECTION_CODES[MessageDirection.INBOX]]
+
+        if sender:
+            query += " AND s.name = ?"
+            params.append(sender)
+
+        if message_type:
+            query += " AND m.message_type = ?"
+            params.append(MESSAGE_TYPE_CODES[message_type])
+
+        query += " ORDER BY m.rowid ASC LIMIT ?"
+        params.append(limit)
+
+        async with self.conn.execute(query, params) as db_cursor:
+            rows = await db_cursor.fetchall()
+            return [dict(row) for row in rows]
+
+    async def get_latest_inbox_cursor(self) -> int:
+        """Get the cursor of the newest inbox message (0 if the inbox is empty)."""
+        # Walks back from the newest row; there is no index on direction alone
+        async with self.conn.execute(
+            "SELECT rowid FROM messages WHERE direction = ? ORDER BY rowid DESC LIMIT 1",
+            (DIRECTION_CODES[MessageDirection.INBOX],)
+        ) as cursor:
+            row = await cursor.fetchone()
+            return row[0] if row else 0
+
+    async def claim_inbox_messages(
+        self,
+        limit: int = 10,
+        visibility_timeout: float = 30.0,
+        message_type: Optional[str] = None,
+        priorities: Optional[list[str]] = None
+    ) -> dict:
+        """
+        Lease up to `limit` unacknowledged inbox messages, most urgent first,
+        with their full content.
+        Leased messages are hidden from other claims until acked, nacked or
+        the lease expires. The single UPDATE makes claiming atomic, so
+        concurrent consumers never get the same message.
+        """
+        now = time.time()
+        lease_id = str(uuid.uuid4())
+        expires_at = now + visibility_timeout
+
+        # Pinned to the partial index: it holds only unacked inbox rows, and
+        # the planner would otherwise pick a full scan. The direction code is
+        # inlined because a bound parameter can't match the index's WHERE.
+        query = f"""
+            SELECT rowid FROM messages INDEXED BY idx_inbox_unacked
+            WHERE direction = {DIRECTION_CODES[MessageDirection.INBOX]} AND acked_at IS NULL
+              AND (lease_expires_at IS NULL OR lease_expires_at <= ?)
+        """
+        params: list = [now]
+
+        if message_type:
+            query += " AND message_type = ?"
+            params.append(MESSAGE_TYPE_CODES[message_type])
+
+        if priorities:
+            query += f" AND priority IN ({','.join('?' * len(priorities))})"
+            params.extend(PRIORITY_CODES[priority] for priority in priorities)
+
+        query += " ORDER BY priority DESC, rowid LIMIT ?"
+        params.append(limit)
+
+        async with self._transaction():
+            async with self.conn.execute(
+                f"""
+                UPDATE messages
+                SET lease_id = ?, lease_expires_at = ?, delivery_count = delivery_count + 1
+                WHERE rowid IN ({query})
+                RETURNING rowid
+                """,
+                [lease_id, expires_at, *params]
+            ) as cursor:
+                claimed = [row[0] for row in await cursor.fetchall()]
+
+        rows = []
+        if claimed:
+            async with self.conn.execute(
+                f"""
+                SELECT m.rowid AS cursor, {_MESSAGE_COLUMNS} {_FROM_MESSAGES}
+                WHERE m.rowid IN ({','.join('?' * len(claimed))})
+                ORDER BY m.priority DESC, m.rowid
+                """,
+                claimed
+            ) as cursor:
+                rows = [dict(row) for row in await cursor.fetchall()]
+            # The worker acts on the content, so out-of-line bodies are loaded
+            rows = [await self.load_content(row) for row in rows]
+
+        logger.debug(f"Lease {lease_id} claimed {len(rows)} inbox messages")
+        return {"lease_id": lease_id, "expires_at": expires_at, "messages": rows}
+
+    async def ack_inbox_messages(self, lease_id: str, message_ids: list[str]) -> list[str]:
+        """
+        Mark leased messages as processed. Only messages still held by this
+        lease are acked; returns their IDs.
+        """
+        placeholders = ",".join("?" * len(message_ids))
+        async with self._transaction():
+            async with self.conn.execute(
+                f"""
+                UPDATE messages
+                SET acked_at = CURRENT_TIMESTAMP, lease_id = NULL, lease_expires_at = NULL
+                WHERE id IN ({placeholders}) AND lease_id = ? AND acked_at IS NULL
+                RETURNING id
+                """,
+                [*message_ids, lease_id]
+            ) as cursor:
+                acked = [row[0] for row in await cursor.fetchall()]
+
+        logger.debug(f"Lease {lease_id} acked {len(acked)} inbox messages")
+        return acked
+
+    async def nack_inbox_messages(self, lease_id: str, message_ids: list[str], delay: float = 0.0) -> list[str]:
+        """
+        Give leased messages back to the queue, visible again after `delay`
+        seconds. Only messages still held by this lease are released; returns their IDs.
+        """
+        placeholders = ",".join("?" * len(message_ids))
+        async with self._transaction():
+            async with self.conn.execute(
+                f"""
+                UPDATE messages
+                SET lease_id = NULL, lease_expires_at = ?
+                WHERE id IN ({placeholders}) AND lease_id = ? AND acked_at IS NULL
+                RETURNING id
+                """,
+                [time.time() + delay, *message_ids, lease_id]
+            ) as cursor:
+                released = [row[0] for row in await cursor.fetchall()]
+
+        logger.debug(f"Lease {lease_id} released {len(released)} inbox messages")
+        return released
+
+    async def get_message_stats(
+        self,
+        since: int,
+        until: int,
+        interval: int = 3600,
+        group_by: Optional[list[str]] = None
+    ) -> list[dict]:
+        """
+        Message counts from the hourly rollup between two Unix times, in
+        buckets of `interval` seconds (a multiple of an hour), optionally split
+        by sender, direction and/or message_type. Reads at most one rollup row
+        per hour and group, however many messages there are.
+        """
+        columns = [f"st.bucket / {interval} * {interval} AS bucket"]
+        group = ["1"]
+        for field in group_by or []:
+            if field == "sender":
+                columns.append("s.name AS sender")
+            elif field == "direction":
+                columns.append(_decode("direction", DIRECTION_CODES, table="st"))
+            elif field == "message_type":
+                columns.append(_decode("message_type", MESSAGE_TYPE_CODES, table="st"))
+            else:
+                raise ValueError(f"Cannot group stats by {field}")
+            group.append(str(len(columns)))
+
+        async with self.conn.execute(
+            f"""
+            SELECT {", ".join(columns)},
+                   SUM(st.messages) AS messages,
+                   SUM(CASE WHEN st.direction = ? THEN st.messages ELSE 0 END) AS outbox,
+                   SUM(st.failed) AS failed
+            FROM message_stats st
+            JOIN senders s ON s.id = st.sender_id
+            WHERE st.bucket >= ? AND st.bucket < ?
+            GROUP BY {", ".join(group)}
+            ORDER BY {", ".join(group)}
+            """,
+            (DIRECTION_CODES[MessageDirection.OUTBOX], since, until)
+        ) as cursor:
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
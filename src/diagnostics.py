@@ -0,0 +1,133 @@
+"""
+Event-loop health: a lag watchdog and an on-demand profiler.
+
+LoopWatchdog keeps a heartbeat coroutine on the loop and a watcher thread
+beside it. When the heartbeat is late by more than `threshold` seconds, the
+watcher captures the loop thread's stack while it is still blocked. This
+shows which call was blocking, not only that the loop stalled.
+
+profile_loop() runs cProfile on the loop thread for a fixed time. It
+profiles whatever the server does in that window.
+"""
+
+import asyncio
+import cProfile
+import io
+import marshal
+import pstats
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from src.config import get_settings
+from src.logging_config import logger
+
+class LoopWatchdog:
+    """Measures event-loop lag and records the stack of each stall."""
+
+    def __init__(self, threshold: float = 0.25, interval: float = 0.1, history: int = 20):
+        self.threshold = threshold
+        self.interval = interval
+        self.stalls: deque[dict] = deque(maxlen=history)
+        self.stall_count = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._beat = time.monotonic()
+        self._loop_thread: int | None = None
+        self._reported_beat: float | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    async def run(self):
+        """Heartbeat on the event loop; starts the watcher thread for its lifetime."""
+        self._loop_thread = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(f"Event loop watchdog started (threshold {self.threshold * 1000:.0f}ms)")
+        try:
+            while True:
+                beat = time.monotonic()
+                self._beat = beat
+                await asyncio.sleep(self.interval)
+                self._record_lag(beat, time.monotonic() - beat - self.interval)
+        finally:
+            self._stop.set()
+            self._thread.join()
+
+    def _record_lag(self, beat: float, lag: float):
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        if self._reported_beat == beat and self.stalls:
+            # The watcher caught this stall while it was happening; fill in its length
+            self.stalls[-1]["blocked_ms"] = round(lag * 1000, 1)
+
+    def _watch(self):
+        while not self._stop.wait(self.interval / 2):
+            beat = self._beat
+            late = time.monotonic() - beat - self.interval
+            if late > self.threshold and self._reported_beat != beat:
+                self._reported_beat = beat
+                self._capture(late)
+
+    def _capture(self, late: float):
+        frame = sys._current_frames().get(self._loop_thread)
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+        self.stall_count += 1
+        self.stalls.append({
+            "detected_at": time.time(),
+            "blocked_ms": round(late * 1000, 1),
+            "stack": stack
+        })
+        logger.warning(f"Event loop blocked for over {late * 1000:.0f}ms in:\n{stack}")
+
+    def stats(self) -> dict:
+        return {
+            "lag_ms": round(self.last_lag * 1000, 2),
+            "max_lag_ms": round(self.max_lag * 1000, 2),
+            "stall_threshold_ms": self.threshold * 1000,
+            "stalls": self.stall_count
+        }
+
+# Global singleton instance
+_loop_watchdog: LoopWatchdog | None = None
+
+def get_loop_watchdog() -> LoopWatchdog:
+    """Get the global event-loop watchdog."""
+    global _loop_watchdog
+    if _loop_watchdog is None:
+        settings = get_settings()
+        _loop_watchdog = LoopWatchdog(settings.LOOP_STALL_THRESHOLD, settings.LOOP_MONITOR_INTERVAL)
+    return _loop_watchdog
+
+class ProfilerBusy(RuntimeError):
+    """Raised when a profiling session is already running."""
+
+_profile_lock = asyncio.Lock()
+
+async def profile_loop(seconds: float) -> cProfile.Profile:
+    """Profile everything running on the event loop for `seconds`."""
+    if _profile_lock.locked():
+        raise ProfilerBusy("A profiling session is already running")
+    async with _profile_lock:
+        profiler = cProfile.Profile()
+        logger.info(f"Profiling event loop for {seconds}s")
+        # cProfile hooks the current thread, which is the loop's own thread
+        profiler.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+        return profiler
+
+def dump_profile(profiler: cProfile.Profile) -> bytes:
+    """Serialize in the format of Profile.dump_stats, loadable with pstats or snakeviz."""
+    profiler.create_stats()
+    return marshal.dumps(profiler.stats)
+
+def format_profile(profiler: cProfile.Profile, limit: int = 50) -> str:
+    """Top functions by cumulative time, as text."""
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
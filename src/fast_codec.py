@@ -0,0 +1,136 @@
+"""
+Fast decode/validate path for inbound messages.
+
+Validates the same rules as src.models.Message, but directly on the decoded
+request body, so the hot inbound endpoints (/inbox, /inbox/batch, /link)
+skip building a pydantic model per message. tests/test_fast_codec.py keeps
+both paths in agreement and compares their speed.
+"""
+
+import re
+from datetime import datetime, timezone
+
+try:
+    import orjson
+
+    def loads(data: bytes | str):
+        return orjson.loads(data)
+
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:  # orjson is optional; stdlib json is just slower
+    import json
+
+    def loads(data: bytes | str):
+        return json.loads(data)
+
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+MESSAGE_TYPES = frozenset(("text", "task", "query"))
+PRIORITIES = frozenset(("normal", "high", "urgent"))
+
+# Unix timestamps above this are taken as milliseconds, as pydantic does
+_MS_THRESHOLD = 2e10
+# Strings pydantic reads as a unix timestamp rather than an ISO 8601 datetime
+_NUMERIC_TIMESTAMP = re.compile(r"[+-]?(?:\d+\.?\d*|\.\d+)")
+
+class MessageValidationError(ValueError):
+    """Raised with FastAPI-style error details when a message fails validation."""
+
+    def __init__(self, errors: list[dict]):
+        super().__init__(f"{len(errors)} validation errors")
+        self.errors = errors
+
+def _required_str(data: dict, field: str, loc: tuple, errors: list[dict]) -> str | None:
+    value = data.get(field)
+    if value is None:
+        if field not in data:
+            errors.append({"loc": [*loc, field], "msg": "Field required", "type": "missing"})
+        else:
+            errors.append({"loc": [*loc, field], "msg": "Input should be a valid string", "type": "string_type"})
+    elif not isinstance(value, str):
+        errors.append({"loc": [*loc, field], "msg": "Input should be a valid string", "type": "string_type"})
+    elif not value:
+        errors.append({"loc": [*loc, field], "msg": "String should have at least 1 character", "type": "string_too_short"})
+    else:
+        return value
+    return None
+
+def _parse_timestamp(value, loc: tuple, errors: list[dict]) -> datetime | None:
+    if isinstance(value, str):
+        if _NUMERIC_TIMESTAMP.fullmatch(value):
+            value = float(value)
+        else:
+            try:
+                return datetime.fromisoformat(value)
+            except ValueError:
+                pass
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        seconds = value / 1000 if abs(value) > _MS_THRESHOLD else value
+        try:
+            return datetime.fromtimestamp(seconds, timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            pass
+    errors.append({"loc": [*loc, "timestamp"], "msg": "Input should be a valid datetime", "type": "datetime_parsing"})
+    return None
+
+def validate_message(data, loc: tuple = ("body",)) -> dict:
+    """
+    Validate one decoded message object.
+    Returns a dict with the Message fields; timestamp is None when not sent.
+    """
+    if not isinstance(data, dict):
+        raise MessageValidationError([{
+            "loc": list(loc),
+            "msg": "Input should be a valid dictionary or object to extract fields from",
+            "type": "model_attributes_type"
+        }])
+
+    errors: list[dict] = []
+    sender = _required_str(data, "sender", loc, errors)
+    content = _required_str(data, "content", loc, errors)
+
+    message_type = data.get("message_type", "text")
+    if not isinstance(message_type, str) or message_type not in MESSAGE_TYPES:
+        errors.append({"loc": [*loc, "message_type"], "msg": "Input should be 'text', 'task' or 'query'", "type": "literal_error"})
+
+    priority = data.get("priority", "normal")
+    if not isinstance(priority, str) or priority not in PRIORITIES:
+        errors.append({"loc": [*loc, "priority"], "msg": "Input should be 'normal', 'high' or 'urgent'", "type": "literal_error"})
+
+    context_id = data.get("context_id")
+    if context_id is not None and not isinstance(context_id, str):
+        errors.append({"loc": [*loc, "context_id"], "msg": "Input should be a valid string", "type": "string_type"})
+
+    timestamp = None
+    if "timestamp" in data:
+        timestamp = _parse_timestamp(data["timestamp"], loc, errors)
+
+    if errors:
+        raise MessageValidationError(errors)
+
+    return {
+        "sender": sender,
+        "content": content,
+        "message_type": message_type,
+        "priority": priority,
+        "context_id": context_id,
+        "timestamp": timestamp
+    }
+
+def decode_message(body: bytes) -> dict:
+    """Decode and validate a single-message request body."""
+    try:
+        data = loads(body)
+    except ValueError:
+        raise MessageValidationError([{"loc": ["body"], "msg": "JSON decode error", "type": "json_invalid"}])
+    return validate_message(data)
+
+def utc_timestamp() -> str:
+    """Current time formatted the way pydantic serializes an aware UTC datetime."""
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+def encode_message_response(msg_id: str, status: str = "received") -> bytes:
+    """Encode a MessageResponse body without building the model."""
+    return dumps({"status": status, "id": msg_id, "timestamp": utc_timestamp()})
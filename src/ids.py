@@ -0,0 +1,47 @@
+"""
+Time-ordered message IDs (UUIDv7, RFC 9562).
+
+IDs keep the canonical UUID text form, so they fit the existing TEXT
+primary key and anything that already parses UUIDs. Their leading 48 bits
+are the creation time in milliseconds, so IDs sort in creation order. New
+rows are appended to the primary-key index instead of landing at random
+positions. IDs also serve as pagination cursors.
+
+Within one millisecond, the 12-bit rand_a field is a counter (RFC 9562
+method 3), so IDs from this process are strictly increasing.
+"""
+
+import secrets
+import threading
+import time
+import uuid
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+def uuid7_from_parts(unix_ms: int, counter: int, tail: int) -> uuid.UUID:
+    """Assemble a UUIDv7 from a millisecond timestamp, 12-bit counter and 62 random bits."""
+    value = (unix_ms & 0xFFFF_FFFF_FFFF) << 80
+    value |= 0x7 << 76
+    value |= (counter & 0xFFF) << 64
+    value |= 0b10 << 62
+    value |= tail & 0x3FFF_FFFF_FFFF_FFFF
+    return uuid.UUID(int=value)
+
+def new_message_id() -> str:
+    """A new UUIDv7 string, greater than any previously returned by this process."""
+    global _last_ms, _counter
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _last_ms:
+            _last_ms = now_ms
+            # Start low in the range so there is room to count up within this millisecond
+            _counter = secrets.randbits(11)
+        else:
+            # Same millisecond, or the clock went back: keep counting from the last ID
+            _counter += 1
+            if _counter > 0xFFF:
+                _last_ms += 1
+                _counter = 0
+        return str(uuid7_from_parts(_last_ms, _counter, secrets.randbits(62)))
@@ -15,12 +15,14 @@ def configure_logging():
     )
     
     # Optional: Add file sink for persistent logs
+    # (opened on the first message rather than at import)
     logger.add(
         "logs/bob_api.log",
         rotation="10 MB",
         retention="1 week",
         level="DEBUG",
-        compression="zip"
+        compression="zip",
+        delay=True
     )
 
 # Initialize on import
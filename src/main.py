@@ -1,17 +1,38 @@
-from fastapi import FastAPI, Header, HTTPException, Depends
+from fastapi import FastAPI, Header, HTTPException, Depends, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from contextlib import asynccontextmanager
 from src.config import get_settings, Settings
-from src.models import Message, MessageResponse
+from src.ids import new_message_id
+from src.models import AckRequest, ClaimRequest, Message, MessageResponse, NackRequest
+from src import fast_codec
+from src.fast_codec import MessageValidationError, decode_message, encode_message_response
 from src.logging_config import logger
 from src.db.connection import get_db_connection, get_async_db
-from src.db.models import CREATE_TABLES_SQL
+from src.db.migrations import migrate
+from src.db.change_sequence import get_change_sequence
 from src.db.repositories.message_repository import MessageRepository
-from src.background_tasks import process_retry_queue
+from src.background_tasks import process_retry_queue, monitor_remote_health
+from src.peers import get_peer_registry
+from src.broadcaster import get_message_broadcaster
+from src.auth import get_api_key_store
+from src.blob_store import BlobNotText, BlobTooLarge, get_blob_store
+from src.admission import PRIORITY_RANK, Overloaded, get_admission_controller
+from src.diagnostics import ProfilerBusy, dump_profile, format_profile, get_loop_watchdog, profile_loop
+from src import tracing
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Literal
 import aiosqlite
-import uuid
 import os
+import json
+import math
 import asyncio
 
+SSE_KEEPALIVE_INTERVAL = 15  # seconds
+SSE_CATCH_UP_PAGE_SIZE = 100
+INBOX_BATCH_MAX_SIZE = 500
+HISTORY_CACHE_SIZE = 64
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Database lifecycle management and background tasks."""
@@ -24,7 +45,7 @@ async def lifespan(app: FastAPI):
     db_conn = get_db_connection()
     sync_conn = db_conn.get_sync_connection()
     try:
-        sync_conn.executescript(CREATE_TABLES_SQL)
+        migrate(sync_conn)
         logger.info(f"Database initialized: {settings.DB_PATH}")
     finally:
         sync_conn.close()
@@ -33,18 +54,29 @@ async def lifespan(app: FastAPI):
     await db_conn.get_async_connection()
     logger.info("Async database connection ready")
 
-    # Start background retry task
-    retry_task = asyncio.create_task(process_retry_queue())
-    logger.info("Retry queue processor started")
+    # Start a retry lane and health monitor per peer
+    peer_registry = get_peer_registry()
+    background_tasks = []
+    for peer in peer_registry:
+        background_tasks.append(asyncio.create_task(process_retry_queue(peer)))
+        background_tasks.append(asyncio.create_task(monitor_remote_health(peer)))
+    logger.info(f"Retry queue processors started for {len(peer_registry)} peers")
+
+    background_tasks.append(asyncio.create_task(get_loop_watchdog().run()))
 
     yield
 
     # Shutdown: Cancel background tasks
-    retry_task.cancel()
-    try:
-        await retry_task
-    except asyncio.CancelledError:
-        logger.info("Retry queue processor stopped")
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    logger.info("Background tasks stopped")
+
+    # Close peer connection pools
+    await peer_registry.close()
+
+    # Export any spans still buffered
+    await tracing.get_tracer().flush()
 
     # Close async connection
     await db_conn.close()
@@ -58,13 +90,23 @@ app = FastAPI(
 )
 
 async def verify_api_key(
-    x_pai_api_key: str = Header(..., alias="X-PAI-API-Key"),
-    settings: Settings = Depends(get_settings)
-):
-    if x_pai_api_key != settings.API_KEY.get_secret_value():
+    x_pai_api_key: str = Header(..., alias="X-PAI-API-Key")
+) -> str:
+    """Authenticate the caller and apply its rate limit. Returns the key's name."""
+    api_key = get_api_key_store().authenticate(x_pai_api_key)
+    if api_key is None:
         logger.warning("Authentication failed: Invalid API Key")
         raise HTTPException(status_code=401, detail="Invalid API Key")
-    return x_pai_api_key
+
+    retry_after = api_key.bucket.consume()
+    if retry_after:
+        logger.warning(f"Rate limit exceeded for key {api_key.name}")
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+    return api_key.name
 
 @app.get("/health")
 async def health_check(settings: Settings = Depends(get_settings)):
@@ -75,41 +117,443 @@ async def health_check(settings: Settings = Depends(get_settings)):
         "version": "1.0.0"
     }
 
-@app.post("/inbox", response_model=MessageResponse)
+async def _store_received_message(message: dict) -> str:
+    """Persist a validated inbound message and notify live subscribers. Returns the inbox ID."""
+    msg_id = new_message_id()
+    logger.info(f"Received message from {message['sender']} (Type: {message['message_type']})")
+
+    # Store message in database
+    with tracing.span("db.commit"):
+        async with get_async_db() as db:
+            repo = MessageRepository(db)
+            stored = await repo.store_inbox_message(
+                message_id=msg_id,
+                sender=message["sender"],
+                content=message["content"],
+                message_type=message["message_type"],
+                priority=message["priority"],
+                context_id=message["context_id"]
+            )
+    _record_latency(message)
+
+    # Notify live subscribers now that the row is committed
+    broadcaster = get_message_broadcaster()
+    if broadcaster.has_subscribers:
+        broadcaster.publish(_inbox_event(stored, message))
+
+    return msg_id
+
+def _record_latency(message: dict):
+    """Record send-to-commit latency for messages that carry the sender's timestamp."""
+    if message.get("timestamp") is None:
+        return
+    latency_ms = tracing.get_tracer().latency.observe(message["timestamp"])
+    current = tracing.current_span()
+    if current is not None:
+        current.set("pai.e2e_latency_ms", round(latency_ms, 1))
+
+def _receive_span(request: Request, **attributes):
+    """Span for handling one inbound request, joined to the sender's trace when it sent one."""
+    return tracing.span("receive", parent=tracing.parse_traceparent(request.headers.get("traceparent")), **attributes)
+
+def _inbox_event(stored: dict, message: dict) -> dict:
+    """Build a subscriber event shaped like the stored row (see get_inbox_since)."""
+    return {
+        "cursor": stored["cursor"],
+        "id": stored["id"],
+        "sender": message["sender"],
+        "content": "" if stored["blob_sha256"] else message["content"],
+        "blob_sha256": stored["blob_sha256"],
+        "content_size": stored["content_size"],
+        "message_type": message["message_type"],
+        "priority": message["priority"],
+        "context_id": message["context_id"],
+        "direction": "inbox",
+        "status": "received",
+        "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+def _overloaded(e: Overloaded) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Server overloaded, retry later",
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+def _validation_error_response(errors: list[dict]) -> JSONResponse:
+    return JSONResponse(status_code=422, content={"detail": errors})
+
+# /inbox and /inbox/batch read the raw body through src.fast_codec instead of
+# pydantic; the schemas are still published in the OpenAPI document.
+_INBOX_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": Message.model_json_schema()}}
+    }
+}
+
+_INBOX_BATCH_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": {
+            "type": "array",
+            "items": Message.model_json_schema(),
+            "maxItems": INBOX_BATCH_MAX_SIZE
+        }}}
+    }
+}
+
+@app.post("/inbox", response_model=MessageResponse, openapi_extra=_INBOX_OPENAPI)
 async def receive_message(
-    message: Message,
+    request: Request,
     api_key: str = Depends(verify_api_key)
 ):
-    msg_id = str(uuid.uuid4())
-    logger.info(f"Received message from {message.sender} (Type: {message.message_type})")
+    try:
+        message = decode_message(await request.body())
+    except MessageValidationError as e:
+        return _validation_error_response(e.errors)
 
-    # Store message in database
+    with _receive_span(request, **{"pai.sender": message["sender"], "pai.priority": message["priority"]}):
+        try:
+            async with get_admission_controller().admit(message["priority"]):
+                msg_id = await _store_received_message(message)
+        except Overloaded as e:
+            raise _overloaded(e)
+
+    return Response(content=encode_message_response(msg_id), media_type="application/json")
+
+@app.post("/inbox/batch", openapi_extra=_INBOX_BATCH_OPENAPI)
+async def receive_messages(
+    request: Request,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Receive up to INBOX_BATCH_MAX_SIZE messages in one request.
+    Each message is validated on its own; valid ones are stored together and
+    results are returned in input order.
+    """
+    try:
+        data = fast_codec.loads(await request.body())
+    except ValueError:
+        return _validation_error_response([{"loc": ["body"], "msg": "JSON decode error", "type": "json_invalid"}])
+    if not isinstance(data, list):
+        return _validation_error_response([{"loc": ["body"], "msg": "Input should be a valid list", "type": "list_type"}])
+    if len(data) > INBOX_BATCH_MAX_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {INBOX_BATCH_MAX_SIZE} messages per batch")
+
+    results: list[dict] = []
+    batch: list[dict] = []
+    for index, item in enumerate(data):
+        try:
+            message = fast_codec.validate_message(item, loc=("body", index))
+        except MessageValidationError as e:
+            results.append({"status": "error", "detail": e.errors})
+            continue
+        message["id"] = new_message_id()
+        batch.append(message)
+        results.append({"status": "received", "id": message["id"]})
+
+    if batch:
+        # The batch is admitted at the priority of its most urgent message
+        priority = min((m["priority"] for m in batch), key=PRIORITY_RANK.__getitem__)
+        with _receive_span(request, **{"pai.batch_size": len(batch), "pai.priority": priority}):
+            try:
+                async with get_admission_controller().admit(priority):
+                    with tracing.span("db.commit"):
+                        async with get_async_db() as db:
+                            repo = MessageRepository(db)
+                            stored = await repo.store_inbox_messages(batch)
+            except Overloaded as e:
+                raise _overloaded(e)
+            for message in batch:
+                _record_latency(message)
+
+        broadcaster = get_message_broadcaster()
+        if broadcaster.has_subscribers:
+            for message, row in zip(batch, stored):
+                broadcaster.publish(_inbox_event(row, message))
+
+    logger.info(f"Received batch of {len(data)} messages ({len(batch)} stored)")
+    return Response(
+        content=fast_codec.dumps({"results": results, "received": len(batch), "timestamp": fast_codec.utc_timestamp()}),
+        media_type="application/json"
+    )
+
+@app.post("/inbox/stream", response_model=MessageResponse)
+async def receive_streamed_message(
+    request: Request,
+    sender: str = Query(..., min_length=1),
+    message_type: Literal["text", "task", "query"] = "text",
+    priority: Literal["normal", "high", "urgent"] = "normal",
+    context_id: str | None = None,
+    timestamp: datetime | None = None,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Receive one large message whose raw UTF-8 body is the content.
+    The body is streamed straight into the blob store instead of being
+    buffered and JSON-decoded; metadata comes from the query string.
+    """
+    message = {
+        "sender": sender,
+        "content": "",
+        "message_type": message_type,
+        "priority": priority,
+        "context_id": context_id,
+        "timestamp": timestamp
+    }
+
+    with _receive_span(request, **{"pai.sender": sender, "pai.priority": priority}):
+        # The upload runs outside admission control: a slow uploader must not hold
+        # a write slot. If the insert is then shed, the blob stays in the store and
+        # a retry with the same content finds it already there.
+        try:
+            digest, size = await get_blob_store().put_stream(request.stream())
+        except BlobTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except BlobNotText as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        if size == 0:
+            raise HTTPException(status_code=422, detail="Content must not be empty")
+
+        msg_id = new_message_id()
+        logger.info(f"Received streamed message from {sender} ({size} bytes)")
+        try:
+            async with get_admission_controller().admit(priority):
+                with tracing.span("db.commit"):
+                    async with get_async_db() as db:
+                        repo = MessageRepository(db)
+                        stored = await repo.store_inbox_message(
+                            message_id=msg_id,
+                            sender=sender,
+                            content="",
+                            message_type=message_type,
+                            priority=priority,
+                            context_id=context_id,
+                            blob_sha256=digest,
+                            content_size=size
+                        )
+        except Overloaded as e:
+            raise _overloaded(e)
+        _record_latency(message)
+
+    broadcaster = get_message_broadcaster()
+    if broadcaster.has_subscribers:
+        broadcaster.publish(_inbox_event(stored, message))
+
+    return Response(content=encode_message_response(msg_id), media_type="application/json")
+
+@app.websocket("/link")
+async def peer_link(websocket: WebSocket):
+    """
+    Persistent message channel for peers (see src/peer_link.py for framing).
+    Frames are processed in order and acknowledged individually, so a peer
+    can pipeline sends without a request/response round-trip per message.
+    The key's rate limit is applied per frame by delaying, which backs up
+    into the sender's window instead of rejecting messages.
+    """
+    api_key = get_api_key_store().authenticate(websocket.headers.get("X-PAI-API-Key", ""))
+    if api_key is None:
+        logger.warning("Authentication failed: Invalid API Key on peer link")
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    logger.info(f"Peer link opened by {api_key.name}")
+    try:
+        while True:
+            frame = await websocket.receive_json()
+            seq = frame.get("seq")
+
+            retry_after = api_key.bucket.consume()
+            while retry_after:
+                await asyncio.sleep(retry_after)
+                retry_after = api_key.bucket.consume()
+
+            try:
+                message = fast_codec.validate_message(frame.get("message"), loc=("message",))
+            except MessageValidationError as e:
+                await websocket.send_json({"type": "nack", "seq": seq, "error": f"Invalid message: {len(e.errors)} errors"})
+                continue
+
+            parent = tracing.parse_traceparent(frame.get("traceparent"))
+            with tracing.span("receive", parent=parent, **{"pai.sender": message["sender"], "pai.link_seq": seq}):
+                try:
+                    async with get_admission_controller().admit(message["priority"]):
+                        msg_id = await _store_received_message(message)
+                except Overloaded as e:
+                    # The sender's retry lane picks the message up again later
+                    await websocket.send_json({"type": "nack", "seq": seq, "error": f"Server overloaded, retry after {e.retry_after}s"})
+                    continue
+            await websocket.send_json({"type": "ack", "seq": seq, "id": msg_id, "status": "received"})
+    except WebSocketDisconnect:
+        logger.info("Peer link closed")
+
+@app.post("/inbox/claim")
+async def claim_messages(request: ClaimRequest, api_key: str = Depends(verify_api_key)):
+    """
+    Lease unprocessed inbox messages for a local consumer, most urgent first.
+    Ack them when done or nack them to hand them back; unacked messages
+    become claimable again when the lease expires.
+    """
     async with get_async_db() as db:
         repo = MessageRepository(db)
-        await repo.store_inbox_message(
-            message_id=msg_id,
-            sender=message.sender,
-            content=message.content,
-            message_type=message.message_type,
-            priority=message.priority,
-            context_id=message.context_id
+        lease = await repo.claim_inbox_messages(
+            limit=request.limit,
+            visibility_timeout=request.visibility_timeout,
+            message_type=request.message_type,
+            priorities=request.priorities
         )
+    lease["count"] = len(lease["messages"])
+    return lease
 
-    return MessageResponse(
-        status="received",
-        id=msg_id
+@app.post("/inbox/ack")
+async def ack_messages(request: AckRequest, api_key: str = Depends(verify_api_key)):
+    """Mark leased messages as processed. IDs not held by the lease are ignored."""
+    async with get_async_db() as db:
+        repo = MessageRepository(db)
+        acked = await repo.ack_inbox_messages(request.lease_id, request.ids)
+    return {"acked": acked, "count": len(acked)}
+
+@app.post("/inbox/nack")
+async def nack_messages(request: NackRequest, api_key: str = Depends(verify_api_key)):
+    """Return leased messages to the queue, claimable again after `delay` seconds."""
+    async with get_async_db() as db:
+        repo = MessageRepository(db)
+        released = await repo.nack_inbox_messages(request.lease_id, request.ids, request.delay)
+    return {"released": released, "count": len(released)}
+
+@app.get("/metrics")
+async def get_metrics(api_key: str = Depends(verify_api_key)):
+    """Load and shedding counters for inbound traffic."""
+    tracer = tracing.get_tracer()
+    return {
+        "admission": get_admission_controller().stats(),
+        "event_loop": get_loop_watchdog().stats(),
+        "delivery_latency": tracer.latency.stats(),
+        "tracing": tracer.stats()
+    }
+
+@app.get("/stats")
+async def get_message_stats(
+    since: datetime | None = None,
+    until: datetime | None = None,
+    interval: Literal["hour", "day"] = "hour",
+    group_by: list[Literal["sender", "direction", "message_type"]] = Query(default=[]),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Message counts and outbox failure rate per hour or day (UTC) between
+    `since` (default 24 hours before `until`) and `until` (default now),
+    optionally split by sender, direction and/or message type. Answered from
+    the hourly rollup table, so cost does not grow with message history.
+    """
+    def unix_time(value: datetime) -> float:
+        # Times without an offset are taken as UTC, like created_at
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+
+    interval_seconds = {"hour": 3600, "day": 86400}[interval]
+    until_ts = math.ceil(unix_time(until or datetime.now(timezone.utc)))
+    since_ts = int(unix_time(since)) if since else until_ts - 86400
+    if since_ts >= until_ts:
+        raise HTTPException(status_code=422, detail="since must be before until")
+    # Whole buckets only, so every bucket covers the full hour or day it is labelled with
+    since_ts -= since_ts % interval_seconds
+    until_ts += -until_ts % interval_seconds
+
+    async with get_async_db() as db:
+        repo = MessageRepository(db)
+        rows = await repo.get_message_stats(since_ts, until_ts, interval=interval_seconds, group_by=group_by)
+
+    totals = {"messages": 0, "outbox": 0, "failed": 0}
+    for row in rows:
+        for field in totals:
+            totals[field] += row[field]
+        row["bucket"] = datetime.fromtimestamp(row["bucket"], timezone.utc).isoformat()
+        row["failure_rate"] = row["failed"] / row["outbox"] if row["outbox"] else None
+
+    return {
+        "since": datetime.fromtimestamp(since_ts, timezone.utc).isoformat(),
+        "until": datetime.fromtimestamp(until_ts, timezone.utc).isoformat(),
+        "interval": interval,
+        "totals": {**totals, "failure_rate": totals["failed"] / totals["outbox"] if totals["outbox"] else None},
+        "buckets": rows
+    }
+
+@app.get("/debug/stalls")
+async def get_loop_stalls(api_key: str = Depends(verify_api_key)):
+    """Recent event-loop stalls, each with the stack that was blocking the loop."""
+    watchdog = get_loop_watchdog()
+    return {"stalls": list(watchdog.stalls), **watchdog.stats()}
+
+@app.get("/debug/profile")
+async def run_profiler(
+    seconds: float = Query(5.0, gt=0),
+    format: Literal["pstats", "text"] = "pstats",
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Profile the live server for `seconds` and return the result, either as a
+    .prof file for pstats/snakeviz or as a text summary.
+    """
+    settings = get_settings()
+    if seconds > settings.PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=422, detail=f"seconds must be at most {settings.PROFILE_MAX_SECONDS}")
+
+    logger.info(f"Profiling session requested by {api_key}")
+    try:
+        profiler = await profile_loop(seconds)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    if format == "text":
+        return Response(content=format_profile(profiler), media_type="text/plain; charset=utf-8")
+    return Response(
+        content=dump_profile(profiler),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": 'attachment; filename="pai-profile.prof"'}
     )
 
+# Serialized /messages responses by query, tagged with the change sequence they were built at
+_history_cache: OrderedDict[tuple, tuple[int, bytes]] = OrderedDict()
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
 @app.get("/messages")
 async def get_message_history(
+    request: Request,
     limit: int = 100,
     sender: str | None = None,
     direction: str | None = None,
+    before: str | None = None,
     api_key: str = Depends(verify_api_key)
 ):
-    """Retrieve message history with optional filtering."""
+    """
+    Retrieve message history with optional filtering, newest first.
+    Pass a page's `next_cursor` as `before` to get the page after it.
+    Responses carry an ETag from the change sequence: pollers sending it back
+    in If-None-Match get 304 without a database query until something is written.
+    """
     from src.db.models import MessageDirection
 
+    changes = get_change_sequence()
+    sequence = changes.value
+    etag = f'"{changes.epoch}-{sequence}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    key = (limit, sender, direction, before)
+    cached = _history_cache.get(key)
+    if cached is not None and cached[0] == sequence:
+        _history_cache.move_to_end(key)
+        return Response(content=cached[1], media_type="application/json", headers=headers)
+
     async with get_async_db() as db:
         repo = MessageRepository(db)
 
@@ -120,8 +564,121 @@ async def get_message_history(
         messages = await repo.get_message_history(
             limit=limit,
             sender=sender,
-            direction=direction_filter
+            direction=direction_filter,
+            before=before
         )
 
     logger.debug(f"Retrieved {len(messages)} messages from history")
-    return {"messages": messages, "count": len(messages)}
+    next_cursor = messages[-1]["id"] if messages and len(messages) == limit else None
+    body = fast_codec.dumps({"messages": messages, "count": len(messages), "next_cursor": next_cursor})
+
+    _history_cache[key] = (sequence, body)
+    _history_cache.move_to_end(key)
+    while len(_history_cache) > HISTORY_CACHE_SIZE:
+        _history_cache.popitem(last=False)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/messages/{message_id}/content")
+async def get_message_content(
+    message_id: str,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Download a message's content as text.
+    Out-of-line content is sent from its blob file (sendfile where available)
+    without being loaded into memory.
+    """
+    async with get_async_db() as db:
+        repo = MessageRepository(db)
+        message = await repo.get_message_by_id(message_id)
+
+    if message is None:
+        raise HTTPException(status_code=404, detail="Message not found")
+    if message["blob_sha256"]:
+        return FileResponse(get_blob_store().path(message["blob_sha256"]), media_type="text/plain; charset=utf-8")
+    return Response(content=message["content"], media_type="text/plain; charset=utf-8")
+
+def _format_sse(event: dict) -> str:
+    return f"id: {event['cursor']}\nevent: message\ndata: {json.dumps(event, default=str)}\n\n"
+
+async def _inbox_event_stream(
+    request: Request,
+    cursor: int | None,
+    sender: str | None,
+    message_type: str | None
+):
+    """
+    Yields inbox messages as Server-Sent Events.
+    Subscribes before reading the database, so catch-up from `cursor` and the
+    live feed overlap rather than leave a gap; duplicates are dropped by cursor.
+    """
+    broadcaster = get_message_broadcaster()
+    subscription = broadcaster.subscribe()
+    try:
+        async with get_async_db() as db:
+            repo = MessageRepository(db)
+
+            catch_up = cursor is not None
+            if cursor is None:
+                cursor = await repo.get_latest_inbox_cursor()
+
+            while True:
+                if catch_up or subscription.overflowed:
+                    # Anything dropped from the queue is already in the database
+                    subscription.drain()
+                    while True:
+                        rows = await repo.get_inbox_since(
+                            cursor,
+                            limit=SSE_CATCH_UP_PAGE_SIZE,
+                            sender=sender,
+                            message_type=message_type
+                        )
+                        for row in rows:
+                            cursor = row["cursor"]
+                            yield _format_sse(row)
+                        if len(rows) < SSE_CATCH_UP_PAGE_SIZE:
+                            break
+                    catch_up = False
+
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=SSE_KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+
+                if event["cursor"] <= cursor:
+                    continue
+                cursor = event["cursor"]
+                if sender and event["sender"] != sender:
+                    continue
+                if message_type and event["message_type"] != message_type:
+                    continue
+                yield _format_sse(event)
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+@app.get("/messages/stream")
+async def stream_messages(
+    request: Request,
+    cursor: int | None = None,
+    sender: str | None = None,
+    message_type: Literal["text", "task", "query"] | None = None,
+    last_event_id: int | None = Header(default=None, alias="Last-Event-ID"),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Subscribe to new inbox messages as Server-Sent Events.
+    Each event id is a cursor; reconnecting with Last-Event-ID (or ?cursor=)
+    replays everything received since then before switching to the live feed.
+    """
+    if last_event_id is not None:
+        cursor = last_event_id
+
+    return StreamingResponse(
+        _inbox_event_stream(request, cursor, sender, message_type),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,20 +1,26 @@
 import asyncio
+import json
 import sys
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent, ImageContent, EmbeddedResource
-from src.client import send_to_remote, check_remote_status
 from src.logging_config import logger
 
+# src.client and src.peers pull in settings, httpx, aiosqlite and the resolver;
+# they are imported on first use so the editor gets a fast handshake.
+
 # Initialize Server
 app = Server("pai-api-bridge")
 
 @app.list_tools()
 async def list_tools() -> list[Tool]:
+    from src.peers import get_peer_registry
+
+    peer_names = get_peer_registry().names
     return [
         Tool(
             name="send_message",
-            description="Send a message to the remote PAI instance (Patterson)",
+            description="Send a message to a remote PAI instance (the default peer unless a recipient is given)",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -27,6 +33,162 @@ async def list_tools() -> list[Tool]:
                         "description": "Priority level (normal, high, urgent)",
                         "enum": ["normal", "high", "urgent"],
                         "default": "normal"
+                    },
+                    "recipient": {
+                        "type": "string",
+                        "description": "Name of the peer to send to",
+                        "enum": peer_names
+                    },
+                    "message_type": {
+                        "type": "string",
+                        "description": "Category of the message",
+                        "enum": ["text", "task", "query"],
+                        "default": "text"
+                    },
+                    "context_id": {
+                        "type": "string",
+                        "description": "Thread ID to group related messages"
+                    },
+                    "wait": {
+                        "type": "boolean",
+                        "description": "Wait for the remote to confirm; false returns the outbox ID immediately",
+                        "default": True
+                    }
+                },
+                "required": ["content"]
+            }
+        ),
+        Tool(
+            name="send_messages",
+            description="Send several messages in one call; they are stored together and delivered concurrently",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "messages": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "content": {"type": "string"},
+                                "priority": {"type": "string", "enum": ["normal", "high", "urgent"]},
+                                "recipient": {"type": "string", "enum": peer_names},
+                                "message_type": {"type": "string", "enum": ["text", "task", "query"]},
+                                "context_id": {"type": "string"}
+                            },
+                            "required": ["content"]
+                        }
+                    },
+                    "wait": {
+                        "type": "boolean",
+                        "description": "Wait for the remotes to confirm; false returns outbox IDs immediately",
+                        "default": True
+                    }
+                },
+                "required": ["messages"]
+            }
+        ),
+        Tool(
+            name="get_delivery_status",
+            description="Look up the delivery status of sent messages by outbox ID",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "ids": {
+                        "type": "array",
+                        "description": "Outbox message IDs",
+                        "items": {"type": "string"}
+                    }
+                },
+                "required": ["ids"]
+            }
+        ),
+        Tool(
+            name="get_history",
+            description="List recent messages, newest first",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "limit": {"type": "integer", "default": 20, "minimum": 1, "maximum": 500},
+                    "sender": {"type": "string", "description": "Only messages from this sender"},
+                    "direction": {"type": "string", "enum": ["inbox", "outbox"]},
+                    "before": {"type": "string", "description": "Only messages older than this message ID (for paging)"}
+                }
+            }
+        ),
+        Tool(
+            name="get_thread",
+            description="List the messages of one conversation thread, oldest first",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "context_id": {"type": "string", "description": "Thread ID"},
+                    "limit": {"type": "integer", "default": 100, "minimum": 1, "maximum": 500}
+                },
+                "required": ["context_id"]
+            }
+        ),
+        Tool(
+            name="claim_messages",
+            description="Lease unprocessed inbox messages (most urgent first) so no other consumer works on them; ack them when done",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "limit": {"type": "integer", "default": 10, "minimum": 1, "maximum": 100},
+                    "message_type": {"type": "string", "enum": ["text", "task", "query"]},
+                    "priorities": {
+                        "type": "array",
+                        "items": {"type": "string", "enum": ["normal", "high", "urgent"]}
+                    },
+                    "visibility_timeout": {
+                        "type": "number",
+                        "default": 300,
+                        "description": "Seconds before unacked messages can be claimed again"
+                    }
+                }
+            }
+        ),
+        Tool(
+            name="ack_messages",
+            description="Finish with leased inbox messages: acknowledge them, or release them back to the queue",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "lease_id": {"type": "string", "description": "Lease ID from claim_messages"},
+                    "ids": {"type": "array", "items": {"type": "string"}, "description": "Message IDs"},
+                    "release": {
+                        "type": "boolean",
+                        "default": False,
+                        "description": "Return the messages to the queue instead of acknowledging them"
+                    },
+                    "delay": {
+                        "type": "number",
+                        "default": 0,
+                        "description": "When releasing, seconds before the messages can be claimed again"
+                    }
+                },
+                "required": ["lease_id", "ids"]
+            }
+        ),
+        Tool(
+            name="broadcast_message",
+            description="Send one message to several remote PAI instances at once (all peers by default)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "content": {
+                        "type": "string",
+                        "description": "The message content to send"
+                    },
+                    "priority": {
+                        "type": "string",
+                        "description": "Priority level (normal, high, urgent)",
+                        "enum": ["normal", "high", "urgent"],
+                        "default": "normal"
+                    },
+                    "recipients": {
+                        "type": "array",
+                        "description": "Names of the peers to send to",
+                        "items": {"type": "string", "enum": peer_names}
                     }
                 },
                 "required": ["content"]
@@ -34,10 +196,16 @@ async def list_tools() -> list[Tool]:
         ),
         Tool(
             name="check_status",
-            description="Check the connectivity and health status of the remote PAI instance",
+            description="Check the connectivity and health status of remote PAI instances",
             inputSchema={
                 "type": "object",
-                "properties": {},
+                "properties": {
+                    "recipient": {
+                        "type": "string",
+                        "description": "Name of the peer to check (all peers when omitted)",
+                        "enum": peer_names
+                    }
+                },
             }
         )
     ]
@@ -45,17 +213,33 @@ async def list_tools() -> list[Tool]:
 @app.call_tool()
 async def call_tool(name: str, arguments: dict) -> list[TextContent | ImageContent | EmbeddedResource]:
     logger.info(f"MCP Tool Called: {name}")
+    from src.client import send_to_remote, send_batch, broadcast_to_peers, check_remote_status, get_delivery_status
+    from src.peers import get_peer_registry
+    from src.db.connection import get_db_connection
+    from src.db.models import MessageDirection
+    from src.db.repositories.message_repository import MessageRepository
     
     try:
         if name == "send_message":
             content = arguments.get("content")
             priority = arguments.get("priority", "normal")
+            recipient = arguments.get("recipient")
+            message_type = arguments.get("message_type", "text")
+            context_id = arguments.get("context_id")
+            wait = arguments.get("wait", True)
             
             if not content:
                 raise ValueError("Content is required")
                 
             logger.debug(f"Sending message to remote: {content[:50]}...")
-            result = await send_to_remote(content=content, priority=priority)
+            result = await send_to_remote(
+                content=content,
+                priority=priority,
+                message_type=message_type,
+                context_id=context_id,
+                recipient=recipient,
+                wait=wait
+            )
             
             status = result.get("status", "unknown")
             details = result.get("id") or result.get("details") or ""
@@ -68,14 +252,112 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent | ImageConte
                 )
             ]
         
+        elif name == "send_messages":
+            messages = arguments.get("messages") or []
+            wait = arguments.get("wait", True)
+
+            if not messages:
+                raise ValueError("At least one message is required")
+
+            logger.debug(f"Sending batch of {len(messages)} messages...")
+            results = await send_batch(messages, wait=wait)
+
+            lines = [
+                f"{index}. Status: {result.get('status', 'unknown')}. Details: {result.get('outbox_id') or result.get('details') or ''}"
+                for index, result in enumerate(results, start=1)
+            ]
+            logger.info(f"Batch sent: {len(results)} messages")
+            return [TextContent(type="text", text="\n".join(lines))]
+
+        elif name == "get_delivery_status":
+            ids = arguments.get("ids") or []
+            statuses = await get_delivery_status(ids)
+            missing = [msg_id for msg_id in ids if msg_id not in statuses]
+            result = {"messages": list(statuses.values()), "unknown_ids": missing}
+            return [TextContent(type="text", text=json.dumps(result, indent=2, default=str))]
+
+        elif name in ("get_history", "get_thread"):
+            conn = await get_db_connection().get_async_connection()
+            repo = MessageRepository(conn)
+
+            if name == "get_history":
+                direction = arguments.get("direction")
+                messages = await repo.get_message_history(
+                    limit=arguments.get("limit", 20),
+                    sender=arguments.get("sender"),
+                    direction=MessageDirection(direction) if direction else None,
+                    before=arguments.get("before")
+                )
+            else:
+                context_id = arguments.get("context_id")
+                if not context_id:
+                    raise ValueError("context_id is required")
+                messages = await repo.get_thread(context_id, limit=arguments.get("limit", 100))
+
+            # MCP clients can't fetch blob content separately, so return it inline
+            messages = [await repo.load_content(message) for message in messages]
+            result = {"messages": messages, "count": len(messages)}
+            return [TextContent(type="text", text=json.dumps(result, indent=2, default=str))]
+
+        elif name in ("claim_messages", "ack_messages"):
+            conn = await get_db_connection().get_async_connection()
+            repo = MessageRepository(conn)
+
+            if name == "claim_messages":
+                result = await repo.claim_inbox_messages(
+                    limit=arguments.get("limit", 10),
+                    visibility_timeout=arguments.get("visibility_timeout", 300),
+                    message_type=arguments.get("message_type"),
+                    priorities=arguments.get("priorities")
+                )
+                result["count"] = len(result["messages"])
+            else:
+                ids = arguments.get("ids") or []
+                if not ids:
+                    raise ValueError("ids is required")
+                if arguments.get("release"):
+                    done = await repo.nack_inbox_messages(arguments["lease_id"], ids, arguments.get("delay", 0))
+                    result = {"released": done}
+                else:
+                    done = await repo.ack_inbox_messages(arguments["lease_id"], ids)
+                    result = {"acked": done}
+                # IDs the lease no longer holds (expired and claimed elsewhere, or already acked)
+                result["not_held"] = [msg_id for msg_id in ids if msg_id not in done]
+
+            return [TextContent(type="text", text=json.dumps(result, indent=2, default=str))]
+
+        elif name == "broadcast_message":
+            content = arguments.get("content")
+            priority = arguments.get("priority", "normal")
+            recipients = arguments.get("recipients")
+
+            if not content:
+                raise ValueError("Content is required")
+
+            logger.debug(f"Broadcasting message: {content[:50]}...")
+            result = await broadcast_to_peers(content=content, priority=priority, recipients=recipients)
+
+            status = result.get("status", "unknown")
+            lines = [f"Broadcast {status}. ID: {result.get('id') or result.get('details')}"]
+            for peer_name, delivery in result.get("deliveries", {}).items():
+                lines.append(f"- {peer_name}: {delivery.get('status', 'unknown')}")
+
+            logger.info(f"Broadcast result: {status}")
+            return [TextContent(type="text", text="\n".join(lines))]
+
         elif name == "check_status":
-            logger.debug("Checking remote status...")
-            result = await check_remote_status()
-            logger.info(f"Remote Status: {result.get('status')}")
+            recipient = arguments.get("recipient")
+            names = [recipient] if recipient else get_peer_registry().names
+            logger.debug(f"Checking status of {names}...")
+            results = await asyncio.gather(*(check_remote_status(peer_name) for peer_name in names))
+            lines = []
+            for peer_name, result in zip(names, results):
+                logger.info(f"{peer_name} Status: {result.get('status')}")
+                lines.append(f"{peer_name} Status: {result.get('status', 'unknown')}\nDetails: {result}")
             return [
                 TextContent(
                     type="text",
-                    text=f"Remote Status: {result.get('status', 'unknown')}\nDetails: {result}"
+                    text="\n".join(lines)
                 )
             ]
         
@@ -94,6 +376,16 @@ async def main():
             app.create_initialization_options()
         )
 
+    # Let non-blocking sends finish; anything left stays queued in the outbox
+    if "src.client" in sys.modules:
+        from src.client import wait_for_background_dispatches
+        await wait_for_background_dispatches()
+
+    # Export spans from this process's sends before exiting
+    if "src.tracing" in sys.modules:
+        from src.tracing import get_tracer
+        await get_tracer().flush()
+
 if __name__ == "__main__":
     try:
         asyncio.run(main())
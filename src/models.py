@@ -15,3 +15,16 @@ class MessageResponse(BaseModel):
     status: str
     id: str
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class ClaimRequest(BaseModel):
+    limit: int = Field(default=10, ge=1, le=100, description="Max messages to lease")
+    visibility_timeout: float = Field(default=30.0, gt=0, le=3600, description="Seconds the lease hides the messages from other consumers")
+    message_type: Optional[Literal['text', 'task', 'query']] = Field(default=None, description="Only lease messages of this type")
+    priorities: Optional[list[Literal['normal', 'high', 'urgent']]] = Field(default=None, description="Only lease messages with these priorities")
+
+class AckRequest(BaseModel):
+    lease_id: str = Field(..., description="Lease returned by the claim")
+    ids: list[str] = Field(..., min_length=1, max_length=100, description="Message IDs to acknowledge")
+
+class NackRequest(AckRequest):
+    delay: float = Field(default=0.0, ge=0, le=3600, description="Seconds before the messages can be claimed again")
@@ -0,0 +1,152 @@
+"""
+Persistent WebSocket link to a peer's /link endpoint.
+
+Messages are sent as JSON text frames and acknowledged individually, so many
+can be in flight on one connection (pipelining) while a window caps how many
+are unacknowledged at once (flow control):
+
+    -> {"type": "message", "seq": 7, "message": {...Message fields...}, "traceparent": "00-..."}
+    <- {"type": "ack", "seq": 7, "id": "<inbox id>", "status": "received"}
+    <- {"type": "nack", "seq": 7, "error": "<reason>"}
+
+Callers fall back to POST /inbox whenever the link is unavailable.
+"""
+
+import asyncio
+import json
+import time
+from typing import TYPE_CHECKING
+from src.logging_config import logger
+from src import tracing
+
+try:
+    from websockets.asyncio.client import connect as ws_connect
+except ImportError:  # websockets is optional; the link is simply never used
+    ws_connect = None
+
+if TYPE_CHECKING:
+    from src.peers import Peer
+
+class LinkUnavailable(Exception):
+    """The link could not carry the message; use the HTTP path instead."""
+
+class LinkRejected(Exception):
+    """The peer received the frame but refused the message (nack)."""
+
+class PeerLink:
+    """A lazily connected, acknowledged message channel to one peer."""
+
+    def __init__(
+        self,
+        peer: "Peer",
+        window: int = 32,
+        retry_interval: float = 30.0,
+        ack_timeout: float = 5.0
+    ):
+        self.peer = peer
+        self.retry_interval = retry_interval
+        self.ack_timeout = ack_timeout
+        self._window = asyncio.Semaphore(window)
+        self._connection = None
+        self._reader: asyncio.Task | None = None
+        self._pending: dict[int, asyncio.Future] = {}
+        self._next_seq = 0
+        self._connect_lock = asyncio.Lock()
+        self._retry_after = 0.0
+
+    @property
+    def connected(self) -> bool:
+        return self._connection is not None
+
+    async def _open(self, url: str, headers: dict):
+        return await ws_connect(url, additional_headers=headers, open_timeout=self.ack_timeout)
+
+    async def _ensure_connected(self, base_url: str):
+        if self._connection is not None:
+            return
+        if ws_connect is None or time.monotonic() < self._retry_after:
+            raise LinkUnavailable("link not available")
+
+        async with self._connect_lock:
+            if self._connection is not None:
+                return
+            url = base_url.replace("http://", "ws://", 1).replace("https://", "wss://", 1) + "/link"
+            headers = {"X-PAI-API-Key": self.peer.api_key.get_secret_value()}
+            try:
+                self._connection = await self._open(url, headers)
+            except Exception as e:
+                # Don't pay the connect cost on every send while the peer lacks /link
+                self._retry_after = time.monotonic() + self.retry_interval
+                raise LinkUnavailable(f"link connect failed: {e}") from e
+
+            self._reader = asyncio.create_task(self._read_acks(self._connection))
+            logger.info(f"Persistent link to {self.peer.name} established")
+
+    async def _read_acks(self, connection):
+        """Resolve pending sends as acks arrive; fail them all if the link drops."""
+        try:
+            async for raw in connection:
+                frame = json.loads(raw)
+                future = self._pending.pop(frame.get("seq"), None)
+                if future is None or future.done():
+                    continue
+                if frame.get("type") == "ack":
+                    future.set_result({"status": frame.get("status", "received"), "id": frame.get("id")})
+                else:
+                    future.set_exception(LinkRejected(frame.get("error", "rejected")))
+        except Exception as e:
+            logger.warning(f"Link to {self.peer.name} dropped: {e}")
+        finally:
+            if self._connection is connection:
+                self._connection = None
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(LinkUnavailable("link closed"))
+            self._pending.clear()
+
+    async def send(self, base_url: str, payload: dict) -> dict:
+        """
+        Send one message over the link and wait for its ack.
+        Raises LinkUnavailable if it cannot be delivered this way.
+        """
+        await self._ensure_connected(base_url)
+
+        async with self._window:
+            connection = self._connection
+            if connection is None:
+                raise LinkUnavailable("link closed")
+
+            self._next_seq += 1
+            seq = self._next_seq
+            future = asyncio.get_running_loop().create_future()
+            self._pending[seq] = future
+
+            try:
+                frame = {"type": "message", "seq": seq, "message": payload}
+                traceparent = tracing.current_traceparent()
+                if traceparent:
+                    frame["traceparent"] = traceparent
+                await connection.send(json.dumps(frame))
+                return await asyncio.wait_for(future, timeout=self.ack_timeout)
+            except (LinkRejected, LinkUnavailable):
+                raise
+            except Exception as e:
+                # An unacknowledged frame may or may not have landed; drop the
+                # link and let the caller retry over HTTP
+                await self.close()
+                raise LinkUnavailable(f"link send failed: {e}") from e
+            finally:
+                self._pending.pop(seq, None)
+
+    async def close(self):
+        """Close the connection; pending sends fail with LinkUnavailable."""
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            await connection.close()
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
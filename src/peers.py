@@ -0,0 +1,113 @@
+"""Registry of remote PAI peers with per-peer connection pools and health state."""
+
+import httpx
+from typing import Iterator
+from pydantic import SecretStr
+from src.config import get_settings
+from src.circuit_breaker import CircuitBreaker
+from src.peer_link import PeerLink
+from src.logging_config import logger
+
+class Peer:
+    """A remote PAI instance we can deliver messages to."""
+
+    def __init__(self, name: str, url: str, api_key: SecretStr, breaker: CircuitBreaker | None = None):
+        self.name = name
+        self.url = url.rstrip("/")
+        self.api_key = api_key
+        if breaker is None:
+            settings = get_settings()
+            breaker = CircuitBreaker(
+                failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+                reset_timeout=settings.CIRCUIT_RESET_TIMEOUT,
+                name=name
+            )
+        self.breaker = breaker
+        self._client: httpx.AsyncClient | None = None
+        self._link: PeerLink | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        Get or create this peer's HTTP client.
+        Keeps connections alive across sends instead of reconnecting per message.
+        """
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5)
+            )
+        return self._client
+
+    @property
+    def link(self) -> PeerLink:
+        """Get or create this peer's persistent message link (connected on first send)."""
+        if self._link is None:
+            settings = get_settings()
+            self._link = PeerLink(
+                self,
+                window=settings.PEER_LINK_WINDOW,
+                retry_interval=settings.PEER_LINK_RETRY_INTERVAL
+            )
+        return self._link
+
+    async def close(self):
+        """Close the peer link and pooled HTTP client."""
+        if self._link is not None:
+            await self._link.close()
+            self._link = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def __repr__(self) -> str:
+        return f"Peer(name={self.name!r}, url={self.url!r})"
+
+class PeerRegistry:
+    """Lookup of peers by recipient name. The first peer is the default recipient."""
+
+    def __init__(self, peers: list[Peer]):
+        if not peers:
+            raise ValueError("At least one peer must be configured")
+        self._peers = {peer.name.lower(): peer for peer in peers}
+        self.default = peers[0]
+
+    def get(self, name: str | None = None) -> Peer | None:
+        """Return the peer for a recipient name (case-insensitive), or the default peer."""
+        if name is None:
+            return self.default
+        return self._peers.get(name.lower())
+
+    @property
+    def names(self) -> list[str]:
+        return [peer.name for peer in self]
+
+    def __iter__(self) -> Iterator[Peer]:
+        return iter(self._peers.values())
+
+    def __len__(self) -> int:
+        return len(self._peers)
+
+    async def close(self):
+        """Close every peer's connection pool."""
+        for peer in self:
+            await peer.close()
+
+def build_registry_from_settings() -> PeerRegistry:
+    """Build the registry from PEERS, falling back to the single REMOTE_PAI_* peer."""
+    settings = get_settings()
+    if settings.PEERS:
+        peers = [Peer(p.name, p.url, p.api_key) for p in settings.PEERS]
+    else:
+        peers = [Peer(settings.REMOTE_PAI_NAME, settings.REMOTE_PAI_URL, settings.REMOTE_PAI_API_KEY)]
+    logger.debug(f"Peer registry: {[peer.name for peer in peers]}")
+    return PeerRegistry(peers)
+
+# Global singleton instance
+_peer_registry: PeerRegistry | None = None
+
+def get_peer_registry() -> PeerRegistry:
+    """Get the global peer registry."""
+    global _peer_registry
+    if _peer_registry is None:
+        _peer_registry = build_registry_from_settings()
+    return _peer_registry
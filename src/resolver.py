@@ -1,7 +1,6 @@
 import socket
 import time
 from functools import lru_cache
-from zeroconf import Zeroconf
 
 # Cache resolutions for 5 minutes
 CACHE_TTL = 300 
@@ -31,7 +30,8 @@ def resolve_mdns(hostname: str) -> str:
         return ip
     except socket.gaierror:
         # Fallback to manual zeroconf if needed (though gethostbyname usually uses system resolver which handles mDNS on mac)
-        # For strict zeroconf library usage:
+        # For strict zeroconf library usage (imported here: it is slow to load and rarely needed):
+        from zeroconf import Zeroconf
         zeroconf = Zeroconf()
         try:
             info = zeroconf.get_service_info("_http._tcp.local.", f"{hostname}.")
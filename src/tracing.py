@@ -0,0 +1,299 @@
+"""
+Lightweight distributed tracing for message delivery.
+
+Spans follow the OpenTelemetry data model. Context crosses to peers in a
+W3C `traceparent` header (or frame field on the peer link), so one
+message's trace covers its whole path. The path runs from the sender's
+outbox, through each delivery attempt, to the peer's commit. A message's
+trace ID is derived from its outbox ID, so retries join the same trace.
+
+Finished spans are buffered and exported in batches off the hot path, to a
+JSON-lines file or as OTLP/HTTP JSON to a collector (TRACE_EXPORTER). With
+no exporter configured, spans are still created, so context still
+propagates, but they are not kept.
+"""
+
+import asyncio
+import json
+import os
+import secrets
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Iterator
+import httpx
+from src.config import get_settings
+from src.logging_config import logger
+
+class Span:
+    """One timed operation in a trace."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: str | None, attributes: dict):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: int | None = None
+        self.attributes = attributes
+        self.error: str | None = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    def end(self, error: str | None = None):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = error
+        get_tracer().record(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+def message_trace_id(message_id: str) -> str:
+    """The trace ID for everything done to deliver one outbox message."""
+    return message_id.replace("-", "")[:32].rjust(32, "0")
+
+def parse_traceparent(header: str | None) -> tuple[str, str] | None:
+    """Return (trace_id, parent span_id) from a W3C traceparent, or None if absent or malformed."""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+def current_traceparent() -> str | None:
+    span = _current_span.get()
+    return span.traceparent if span is not None else None
+
+def start_span(
+    name: str,
+    trace_id: str | None = None,
+    parent: tuple[str, str] | None = None,
+    **attributes
+) -> Span:
+    """
+    Start a span. Its parent is `parent` (a remote context), else the current
+    span, else it starts a trace (`trace_id` or a random one). End it with span.end().
+    """
+    if parent is not None:
+        trace_id, parent_id = parent
+    else:
+        current = _current_span.get()
+        if current is not None:
+            trace_id, parent_id = current.trace_id, current.span_id
+        else:
+            trace_id, parent_id = trace_id or secrets.token_hex(16), None
+    return Span(name, trace_id, parent_id, attributes)
+
+@contextmanager
+def span(
+    name: str,
+    trace_id: str | None = None,
+    parent: tuple[str, str] | None = None,
+    **attributes
+) -> Iterator[Span]:
+    """Run a block as the current span; exceptions mark it as failed."""
+    current = start_span(name, trace_id, parent, **attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.end(error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+
+def httpx_trace_hook():
+    """An httpx `trace` extension that records connect and TLS handshakes as spans."""
+    open_spans: dict[str, Span] = {}
+
+    async def trace(event_name: str, info: dict):
+        step, _, stage = event_name.rpartition(".")
+        if step not in ("connection.connect_tcp", "connection.start_tls"):
+            return
+        if stage == "started":
+            open_spans[step] = start_span("connect" if step.endswith("tcp") else "tls")
+        elif step in open_spans:
+            open_spans.pop(step).end(error=str(info.get("exception")) if stage == "failed" else None)
+
+    return trace
+
+class LatencyRecorder:
+    """Recent end-to-end delivery latencies for percentile reporting."""
+
+    def __init__(self, size: int = 1024):
+        self.samples: deque[float] = deque(maxlen=size)
+        self.count = 0
+
+    def observe(self, sent_at: datetime, received_at: datetime | None = None) -> float:
+        """Record one message's latency and return it in milliseconds."""
+        if sent_at.tzinfo is None:
+            sent_at = sent_at.replace(tzinfo=timezone.utc)  # Peers send UTC
+        received_at = received_at or datetime.now(timezone.utc)
+        latency_ms = (received_at - sent_at).total_seconds() * 1000
+        self.samples.append(latency_ms)
+        self.count += 1
+        return latency_ms
+
+    def stats(self) -> dict:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {"count": self.count}
+
+        def percentile(p: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 1)
+
+        return {
+            "count": self.count,
+            "p50_ms": percentile(0.5),
+            "p90_ms": percentile(0.9),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(ordered[-1], 1)
+        }
+
+class FileExporter:
+    """Appends spans as JSON lines."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _write(self, lines: str):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    async def export(self, spans: list[Span]):
+        lines = "".join(json.dumps(s.to_dict(), default=str) + "\n" for s in spans)
+        await asyncio.to_thread(self._write, lines)
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+class OtlpExporter:
+    """Posts spans to an OTLP/HTTP collector using the JSON encoding."""
+
+    def __init__(self, endpoint: str, service_name: str):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self._client: httpx.AsyncClient | None = None
+
+    def encode(self, spans: list[Span]) -> dict:
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+            "scopeSpans": [{
+                "scope": {"name": "pai"},
+                "spans": [{
+                    "traceId": s.trace_id,
+                    "spanId": s.span_id,
+                    "parentSpanId": s.parent_id or "",
+                    "name": s.name,
+                    "startTimeUnixNano": str(s.start_ns),
+                    "endTimeUnixNano": str(s.end_ns),
+                    "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items() if v is not None],
+                    "status": {"code": 2, "message": s.error} if s.error else {"code": 1}
+                } for s in spans]
+            }]
+        }]}
+
+    async def export(self, spans: list[Span]):
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=5.0)
+        response = await self._client.post(self.endpoint, json=self.encode(spans))
+        response.raise_for_status()
+
+class Tracer:
+    """Buffers finished spans and exports them in batches."""
+
+    def __init__(self, exporter=None, export_interval: float = 5.0, max_buffer: int = 10000):
+        self.exporter = exporter
+        self.export_interval = export_interval
+        self.latency = LatencyRecorder()
+        self._buffer: deque[Span] = deque(maxlen=max_buffer)
+        self._flush_task: asyncio.Task | None = None
+        self.exported = 0
+        self.dropped = 0
+
+    def record(self, span: Span):
+        if self.exporter is None:
+            return
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append(span)
+        if self._flush_task is None:
+            try:
+                self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+            except RuntimeError:
+                pass  # No loop (e.g. at shutdown); the next flush() picks it up
+
+    async def _flush_later(self):
+        try:
+            await asyncio.sleep(self.export_interval)
+        finally:
+            self._flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        """Export everything buffered so far."""
+        if not self._buffer or self.exporter is None:
+            return
+        batch = list(self._buffer)
+        self._buffer.clear()
+        try:
+            await self.exporter.export(batch)
+            self.exported += len(batch)
+        except Exception as e:
+            self.dropped += len(batch)
+            logger.warning(f"Trace export failed, dropped {len(batch)} spans: {e}")
+
+    def stats(self) -> dict:
+        return {"buffered": len(self._buffer), "exported": self.exported, "dropped": self.dropped}
+
+# Global singleton instance
+_tracer: Tracer | None = None
+
+def get_tracer() -> Tracer:
+    """Get the global tracer."""
+    global _tracer
+    if _tracer is None:
+        settings = get_settings()
+        exporter = None
+        if settings.TRACE_EXPORTER == "file":
+            exporter = FileExporter(settings.TRACE_FILE)
+        elif settings.TRACE_EXPORTER == "otlp":
+            exporter = OtlpExporter(settings.TRACE_OTLP_ENDPOINT, settings.SYSTEM_NAME)
+        _tracer = Tracer(exporter, settings.TRACE_EXPORT_INTERVAL)
+    return _tracer
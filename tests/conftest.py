@@ -0,0 +1,14 @@
+import pytest_asyncio
+from src.db.connection import DatabaseConnection
+from src.db.migrations import migrate
+from src.db.repositories.message_repository import MessageRepository
+
+@pytest_asyncio.fixture
+async def repo(tmp_path):
+    """A MessageRepository on a fresh, fully migrated database."""
+    db = DatabaseConnection(str(tmp_path / "messages.db"))
+    sync_conn = db.get_sync_connection()
+    migrate(sync_conn)
+    sync_conn.close()
+    yield MessageRepository(await db.get_async_connection())
+    await db.close()
@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from src.admission import AdmissionController, Overloaded
+from src.blob_store import BlobStore
+from src.main import app
+
+client = TestClient(app)
+
+@pytest.mark.asyncio
+async def test_urgent_waiters_are_admitted_first():
+    controller = AdmissionController(max_in_flight=1, max_queue=10, normal_queue=10)
+    order = []
+    release = asyncio.Event()
+
+    async def request(priority: str):
+        async with controller.admit(priority):
+            order.append(priority)
+            await release.wait()
+
+    holder = asyncio.create_task(request("normal"))
+    await asyncio.sleep(0)
+    waiters = [asyncio.create_task(request(p)) for p in ("normal", "high", "urgent")]
+    await asyncio.sleep(0)
+    assert controller.queue_depth == 3
+
+    release.set()
+    await asyncio.gather(holder, *waiters)
+
+    assert order == ["normal", "urgent", "high", "normal"]
+    assert controller.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_normal_traffic_is_shed_when_saturated():
+    controller = AdmissionController(max_in_flight=1, max_queue=4, normal_queue=0, queue_timeout=0.05)
+
+    async with controller.admit("normal"):
+        with pytest.raises(Overloaded) as shed:
+            async with controller.admit("normal"):
+                pass
+        assert shed.value.retry_after >= 1
+
+        # Urgent traffic may still queue, but is shed once it waits too long
+        with pytest.raises(Overloaded) as timed_out:
+            async with controller.admit("urgent"):
+                pass
+        assert timed_out.value.reason == "timeout"
+
+    stats = controller.stats()
+    assert stats["shed"] == {"urgent": 1, "high": 0, "normal": 1}
+    assert stats["shed_reasons"] == {"queue_full": 1, "timeout": 1}
+    assert stats["in_flight"] == 0 and stats["queue_depth"] == 0
+
+def test_inbox_returns_503_when_shedding():
+    controller = AdmissionController(max_in_flight=0, normal_queue=0)
+    headers = {"X-PAI-API-Key": "dev-key"}
+
+    with patch("src.main.get_admission_controller", return_value=controller):
+        response = client.post("/inbox", json={"sender": "pat", "content": "hi"}, headers=headers)
+        metrics = client.get("/metrics", headers=headers).json()
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert metrics["admission"]["shed"]["normal"] == 1
+
+def test_streamed_upload_does_not_hold_a_write_slot(tmp_path):
+    controller = AdmissionController(max_in_flight=1, max_queue=0, normal_queue=0)
+    blobs = BlobStore(str(tmp_path / "blobs"), threshold=1024, max_size=64 * 1024)
+    put_stream = blobs.put_stream
+    in_flight_during_upload = []
+
+    async def watched_put_stream(chunks):
+        in_flight_during_upload.append(controller.in_flight)
+        return await put_stream(chunks)
+
+    with patch("src.main.get_admission_controller", return_value=controller), \
+         patch("src.blob_store._blob_store", blobs), \
+         patch.object(blobs, "put_stream", watched_put_stream):
+        response = client.post(
+            "/inbox/stream", params={"sender": "uploader"}, content="x" * 2000,
+            headers={"X-PAI-API-Key": "dev-key"}
+        )
+
+    assert response.status_code == 200
+    assert in_flight_during_upload == [0]
+    assert controller.admitted["normal"] == 1
@@ -0,0 +1,62 @@
+import json
+import os
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from pydantic import SecretStr
+from src.auth import ApiKeyStore, TokenBucket, add_api_key
+from src.main import app
+
+client = TestClient(app)
+
+def test_token_bucket_limits_burst():
+    bucket = TokenBucket(rate=1.0, capacity=2)
+    assert bucket.consume() == 0
+    assert bucket.consume() == 0
+    assert 0 < bucket.consume() <= 1.0
+
+def test_store_accepts_default_and_file_keys(tmp_path):
+    path = str(tmp_path / "keys.json")
+    key = add_api_key(path, "Patterson")
+
+    with open(path) as f:
+        stored = json.load(f)
+    assert key not in json.dumps(stored)  # Only the hash is at rest
+
+    store = ApiKeyStore(path, default_key=SecretStr("dev-key"))
+    assert store.authenticate("dev-key").name == "default"
+    assert store.authenticate(key).name == "Patterson"
+    assert store.authenticate("wrong-key") is None
+
+def test_store_picks_up_rotated_keys(tmp_path):
+    path = str(tmp_path / "keys.json")
+    old_key = add_api_key(path, "Patterson")
+    store = ApiKeyStore(path, reload_interval=0)
+    assert store.authenticate(old_key) is not None
+
+    # Rotate: replace the old key with a new one
+    os.remove(path)
+    new_key = add_api_key(path, "Patterson")
+    os.utime(path, (0, 0))
+
+    assert store.authenticate(new_key).name == "Patterson"
+    assert store.authenticate(old_key) is None
+
+def test_rate_limited_key_gets_429(tmp_path):
+    store = ApiKeyStore(str(tmp_path / "none.json"), default_key=SecretStr("dev-key"), burst=1, default_rate=0.5)
+
+    with patch("src.main.get_api_key_store", return_value=store):
+        headers = {"X-PAI-API-Key": "dev-key"}
+        assert client.get("/messages", headers=headers).status_code == 200
+
+        response = client.get("/messages", headers=headers)
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "2"
+
+def test_legacy_key_is_unlimited_by_default(tmp_path):
+    path = str(tmp_path / "keys.json")
+    peer_key = add_api_key(path, "Patterson")
+    store = ApiKeyStore(path, default_key=SecretStr("dev-key"), rate=0.5, burst=1)
+
+    assert all(store.authenticate("dev-key").bucket.consume() == 0 for _ in range(100))
+    assert store.authenticate(peer_key).bucket.consume() == 0
+    assert store.authenticate(peer_key).bucket.consume() > 0
@@ -0,0 +1,103 @@
+import os
+import uuid
+import pytest
+from unittest.mock import patch, AsyncMock
+from fastapi.testclient import TestClient
+from pydantic import SecretStr
+from src.blob_store import BlobStore
+from src.client import deliver_message
+from src.db.connection import get_async_db
+from src.db.models import MessageStatus
+from src.db.repositories.message_repository import MessageRepository
+from src.main import app
+from src.peers import Peer
+
+client = TestClient(app)
+HEADERS = {"X-PAI-API-Key": "dev-key"}
+
+@pytest.fixture
+def blobs(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs"), threshold=1024, max_size=64 * 1024)
+    with patch("src.blob_store._blob_store", store):
+        yield store
+
+def test_put_deduplicates_by_content(blobs):
+    first = blobs.put(b"x" * 2000)
+    second = blobs.put(b"x" * 2000)
+
+    assert first == second
+    assert len(os.listdir(os.path.dirname(blobs.path(first)))) == 1
+    assert blobs.read_text(first) == "x" * 2000
+
+def test_threshold_counts_utf8_bytes(blobs):
+    assert not blobs.should_externalize("a" * 1024)
+    assert blobs.should_externalize("a" * 1025)
+    assert blobs.should_externalize("é" * 600)  # 1200 bytes
+
+def test_large_inbox_message_is_stored_out_of_line(blobs):
+    content = "large " * 1000
+    sender = f"pat-{uuid.uuid4()}"
+    response = client.post("/inbox", json={"sender": sender, "content": content}, headers=HEADERS)
+    msg_id = response.json()["id"]
+
+    history = client.get("/messages", params={"sender": sender}, headers=HEADERS).json()
+    row = history["messages"][0]
+    assert row["id"] == msg_id
+    assert row["content"] == ""
+    assert row["content_size"] == len(content)
+    assert blobs.exists(row["blob_sha256"])
+
+    download = client.get(f"/messages/{msg_id}/content", headers=HEADERS)
+    assert download.status_code == 200
+    assert download.text == content
+
+def test_streamed_upload_round_trip(blobs):
+    content = "streamed ✓ " * 500
+    response = client.post(
+        "/inbox/stream",
+        params={"sender": "pat", "message_type": "task"},
+        content=content.encode("utf-8"),
+        headers=HEADERS
+    )
+    assert response.status_code == 200
+
+    download = client.get(f"/messages/{response.json()['id']}/content", headers=HEADERS)
+    assert download.text == content
+
+def test_streamed_upload_rejects_bad_bodies(blobs):
+    params = {"sender": "pat"}
+    assert client.post("/inbox/stream", params=params, content=b"\xff\xfe", headers=HEADERS).status_code == 422
+    assert client.post("/inbox/stream", params=params, content=b"x" * (64 * 1024 + 1), headers=HEADERS).status_code == 413
+    assert not [name for name in os.listdir(blobs.root) if name.startswith(".upload-")]
+
+@pytest.mark.asyncio
+async def test_retry_queue_reads_out_of_line_content(blobs):
+    msg_id = str(uuid.uuid4())
+    recipient = f"peer-{msg_id}"
+    content = "retry me " * 500
+
+    async with get_async_db() as db:
+        repo = MessageRepository(db)
+        await repo.store_outbox_message(msg_id, "Bob", content, "text", "normal", MessageStatus.PENDING_SEND, [recipient])
+        pending = await repo.get_pending_outbox_messages(recipient)
+
+    assert [m["content"] for m in pending] == [content]
+
+@pytest.mark.asyncio
+async def test_large_delivery_uses_streaming_endpoint(blobs):
+    peer = Peer("Patterson", "http://localhost:8001", SecretStr("key"))
+    payload = {"sender": "Bob", "content": "y" * 2000, "message_type": "text", "priority": "normal", "context_id": None}
+
+    with patch("httpx.AsyncClient.post", new_callable=AsyncMock) as mock_post:
+        mock_response = AsyncMock()
+        mock_response.json = lambda: {"status": "received", "id": "123"}
+        mock_response.raise_for_status = lambda: None
+        mock_post.return_value = mock_response
+
+        await deliver_message(peer, payload)
+
+    args, kwargs = mock_post.call_args
+    assert args[0] == "http://localhost:8001/inbox/stream"
+    assert kwargs["content"] == b"y" * 2000
+    assert kwargs["params"] == {"sender": "Bob", "message_type": "text", "priority": "normal"}
+    await peer.close()
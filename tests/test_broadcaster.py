@@ -0,0 +1,65 @@
+import pytest
+import json
+import uuid
+from unittest.mock import AsyncMock
+from fastapi.testclient import TestClient
+from src.broadcaster import MessageBroadcaster, get_message_broadcaster
+from src.db.connection import get_db_connection
+from src.db.repositories.message_repository import MessageRepository
+from src.main import _inbox_event_stream, app
+
+client = TestClient(app)
+
+def test_publish_reaches_subscribers():
+    broadcaster = MessageBroadcaster()
+    subscription = broadcaster.subscribe()
+    broadcaster.publish({"cursor": 1})
+    assert subscription.queue.get_nowait() == {"cursor": 1}
+
+    broadcaster.unsubscribe(subscription)
+    assert not broadcaster.has_subscribers
+
+def test_slow_subscriber_overflows_instead_of_blocking():
+    broadcaster = MessageBroadcaster(max_queue_size=2)
+    subscription = broadcaster.subscribe()
+    for cursor in range(3):
+        broadcaster.publish({"cursor": cursor})
+    assert subscription.overflowed
+
+    subscription.drain()
+    assert subscription.queue.empty()
+    assert not subscription.overflowed
+
+def parse_event(chunk: str) -> dict:
+    data = next(line for line in chunk.splitlines() if line.startswith("data: "))
+    return json.loads(data[len("data: "):])
+
+@pytest.mark.asyncio
+async def test_stream_catches_up_then_goes_live():
+    conn = await get_db_connection().get_async_connection()
+    repo = MessageRepository(conn)
+    sender = f"stream-{uuid.uuid4()}"
+
+    first = await repo.store_inbox_message(str(uuid.uuid4()), sender, "one", "text", "normal")
+    second = await repo.store_inbox_message(str(uuid.uuid4()), sender, "two", "text", "normal")
+
+    request = AsyncMock()
+    request.is_disconnected.return_value = False
+    stream = _inbox_event_stream(request, first["cursor"] - 1, sender, None)
+
+    # Catch-up from the database
+    assert parse_event(await stream.__anext__())["content"] == "one"
+    assert parse_event(await stream.__anext__())["content"] == "two"
+
+    # Live events, with already-delivered cursors skipped
+    broadcaster = get_message_broadcaster()
+    broadcaster.publish({"cursor": second["cursor"], "sender": sender, "message_type": "text", "content": "dup"})
+    broadcaster.publish({"cursor": second["cursor"] + 1, "sender": sender, "message_type": "text", "content": "three"})
+    assert parse_event(await stream.__anext__())["content"] == "three"
+
+    await stream.aclose()
+    assert not broadcaster.has_subscribers
+
+def test_stream_rejects_unknown_message_type():
+    response = client.get("/messages/stream", params={"message_type": "memo"}, headers={"X-PAI-API-Key": "dev-key"})
+    assert response.status_code == 422
@@ -0,0 +1,73 @@
+import pytest
+from unittest.mock import patch, AsyncMock
+from src.circuit_breaker import CircuitBreaker, CircuitState
+from src.client import send_to_remote
+from src.peers import Peer, PeerRegistry
+from pydantic import SecretStr
+
+import httpx
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30.0)
+    breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow_request()
+
+def test_breaker_half_open_allows_single_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30.0)
+    breaker.record_failure()
+    breaker.opened_at -= 60  # Pretend the reset timeout has elapsed
+    assert breaker.state == CircuitState.HALF_OPEN
+
+    assert breaker.allow_request()
+    # Trial in flight, everyone else keeps short-circuiting
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.allow_request()
+
+@pytest.mark.asyncio
+async def test_wait_for_recovery_wakes_on_close():
+    breaker = CircuitBreaker(failure_threshold=1)
+    assert not await breaker.wait_for_recovery(0.01)
+
+    breaker.record_failure()
+    breaker.record_success()
+    assert await breaker.wait_for_recovery(1.0)
+    # Wake-up is consumed once
+    assert not await breaker.wait_for_recovery(0.01)
+
+@pytest.mark.asyncio
+async def test_send_to_remote_queues_when_circuit_open():
+    breaker = CircuitBreaker(failure_threshold=1)
+    breaker.record_failure()
+
+    registry = PeerRegistry([Peer("Patterson", "http://localhost:8001", SecretStr("key"), breaker)])
+
+    with patch("src.client.get_peer_registry", return_value=registry):
+        with patch("httpx.AsyncClient.post", new_callable=AsyncMock) as mock_post:
+            result = await send_to_remote("Hello")
+
+            mock_post.assert_not_called()
+            assert result["status"] == "queued"
+            assert result["outbox_id"] == result["id"]
+
+@pytest.mark.asyncio
+async def test_send_to_remote_trips_breaker():
+    breaker = CircuitBreaker(failure_threshold=2)
+
+    registry = PeerRegistry([Peer("Patterson", "http://localhost:8001", SecretStr("key"), breaker)])
+
+    with patch("src.client.get_peer_registry", return_value=registry):
+        with patch("httpx.AsyncClient.post", new_callable=AsyncMock) as mock_post:
+            mock_post.side_effect = httpx.RequestError("Network Boom", request=None)
+
+            await send_to_remote("one")
+            await send_to_remote("two")
+            result = await send_to_remote("three")
+
+            assert mock_post.call_count == 2
+            assert result["status"] == "queued"
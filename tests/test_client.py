@@ -1,6 +1,6 @@
 import pytest
 from unittest.mock import patch, AsyncMock
-from src.client import send_to_remote
+from src.client import send_to_remote, send_batch, get_delivery_status, wait_for_background_dispatches
 
 import httpx
 
@@ -33,3 +33,41 @@ async def test_send_to_remote_failure():
         assert result["status"] == "error"
         assert "Network Boom" in result["details"]
 
+
+def mock_received_response():
+    mock_response = AsyncMock()
+    mock_response.json = lambda: {"status": "received", "id": "123"}
+    mock_response.raise_for_status = lambda: None
+    return mock_response
+
+@pytest.mark.asyncio
+async def test_send_to_remote_without_waiting():
+    with patch("httpx.AsyncClient.post", new_callable=AsyncMock) as mock_post:
+        mock_post.return_value = mock_received_response()
+
+        result = await send_to_remote("Hello", wait=False)
+        assert result["status"] == "queued"
+
+        await wait_for_background_dispatches()
+        mock_post.assert_called_once()
+
+        statuses = await get_delivery_status([result["outbox_id"], "no-such-id"])
+        assert list(statuses) == [result["outbox_id"]]
+        assert statuses[result["outbox_id"]]["status"] == "sent"
+        assert statuses[result["outbox_id"]]["deliveries"][0]["status"] == "sent"
+
+@pytest.mark.asyncio
+async def test_send_batch():
+    with patch("httpx.AsyncClient.post", new_callable=AsyncMock) as mock_post:
+        mock_post.return_value = mock_received_response()
+
+        results = await send_batch([
+            {"content": "one", "context_id": "batch-thread"},
+            {"content": "two", "recipient": "nobody"},
+            {"content": "three", "priority": "urgent", "context_id": "batch-thread"},
+            {"content": "four", "priority": "asap"},
+        ])
+
+        assert [r["status"] for r in results] == ["received", "error", "received", "error"]
+        assert results[3]["details"] == "Item 3: unknown priority 'asap'"
+        assert mock_post.call_count == 2
@@ -0,0 +1,79 @@
+import sqlite3
+import pytest
+from unittest.mock import patch
+from src.db.migrations import migrate, MIGRATIONS, _compact_messages
+from src.db.models import CREATE_TABLES_SQL
+from src.db.repositories.message_repository import _FROM_MESSAGES, _MESSAGE_COLUMNS
+from src.ids import new_message_id
+
+def seed(conn: sqlite3.Connection, count: int):
+    conn.executemany(
+        """
+        INSERT INTO messages (id, sender, content, message_type, priority, context_id, direction, status)
+        VALUES (?, ?, 'hello', ?, ?, ?, ?, ?)
+        """,
+        [
+            (new_message_id(), f"agent-{i % 5}", ("text", "task", "query")[i % 3], ("normal", "high", "urgent")[i % 3],
+             f"ctx-{i // 10}", ("inbox", "outbox")[i % 2], ("received", "sent")[i % 2])
+            for i in range(count)
+        ]
+    )
+    conn.commit()
+
+def database_size(conn: sqlite3.Connection) -> int:
+    conn.execute("VACUUM")
+    return conn.execute("PRAGMA page_count").fetchone()[0] * conn.execute("PRAGMA page_size").fetchone()[0]
+
+def test_migration_encodes_rows_and_keeps_cursors(tmp_path):
+    conn = sqlite3.connect(tmp_path / "legacy.db")
+    conn.executescript(CREATE_TABLES_SQL)
+    conn.execute(
+        """
+        INSERT INTO messages (id, sender, content, message_type, priority, direction, status, created_at)
+        VALUES ('m1', 'Bob', 'hi', 'task', 'urgent', 'outbox', 'failed', '2024-01-01 00:00:00')
+        """
+    )
+    conn.execute("INSERT INTO messages (id, sender, content, direction, status) VALUES ('m2', 'Bob', 'yo', 'inbox', 'received')")
+    conn.commit()
+    rowids = [row[0] for row in conn.execute("SELECT rowid FROM messages ORDER BY rowid")]
+
+    migrate(conn)
+
+    assert conn.execute("SELECT name FROM senders").fetchall() == [("Bob",)]
+    assert [row[0] for row in conn.execute("SELECT rowid FROM messages ORDER BY rowid")] == rowids
+    conn.row_factory = sqlite3.Row
+    rows = [dict(row) for row in conn.execute(f"SELECT {_MESSAGE_COLUMNS} {_FROM_MESSAGES} ORDER BY m.rowid")]
+    assert [(r["sender"], r["content"], r["message_type"], r["priority"], r["direction"], r["status"]) for r in rows] == [
+        ("Bob", "hi", "task", "urgent", "outbox", "failed"),
+        ("Bob", "yo", "text", "normal", "inbox", "received"),
+    ]
+    # Outbox status is still rolled up from deliveries
+    conn.execute("UPDATE deliveries SET status = 'sent'")
+    assert conn.execute("SELECT status FROM messages WHERE content = 'hi'").fetchone()[0] == 2
+    conn.close()
+
+def test_enum_columns_reject_unknown_codes(tmp_path):
+    conn = sqlite3.connect(tmp_path / "fresh.db")
+    migrate(conn)
+    conn.execute("INSERT INTO senders (name) VALUES ('Bob')")
+
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("INSERT INTO messages (id, sender_id, content, direction, priority) VALUES ('m1', 1, 'hi', 0, 7)")
+    conn.close()
+
+def test_compact_schema_is_smaller(tmp_path):
+    before = sqlite3.connect(tmp_path / "before.db")
+    with patch("src.db.migrations.MIGRATIONS", MIGRATIONS[:MIGRATIONS.index(_compact_messages)]):
+        migrate(before)
+    seed(before, 20_000)
+    before.execute(f"VACUUM INTO '{tmp_path / 'after.db'}'")
+    after = sqlite3.connect(tmp_path / "after.db")
+    migrate(after)
+
+    assert database_size(after) < database_size(before) * 0.9
+    # Only the indexes the repository queries use are left on messages
+    assert {row[0] for row in after.execute("SELECT name FROM pragma_index_list('messages') WHERE origin = 'c'")} == {
+        "idx_messages_sender", "idx_messages_context_id", "idx_inbox_unacked"
+    }
+    before.close()
+    after.close()
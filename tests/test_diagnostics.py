@@ -0,0 +1,47 @@
+import asyncio
+import marshal
+import time
+import pytest
+from fastapi.testclient import TestClient
+from src.diagnostics import LoopWatchdog
+from src.main import app
+
+client = TestClient(app)
+HEADERS = {"X-PAI-API-Key": "dev-key"}
+
+def blocking_call():
+    time.sleep(0.3)
+
+@pytest.mark.asyncio
+async def test_watchdog_captures_blocking_stack():
+    watchdog = LoopWatchdog(threshold=0.1, interval=0.02)
+    task = asyncio.create_task(watchdog.run())
+    await asyncio.sleep(0.05)
+
+    blocking_call()
+    await asyncio.sleep(0.05)
+
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    assert watchdog.stall_count == 1
+    stall = watchdog.stalls[0]
+    assert "blocking_call" in stall["stack"]
+    assert stall["blocked_ms"] >= 250
+    assert watchdog.max_lag >= 0.25
+
+def test_profile_endpoint_returns_pstats_file():
+    response = client.get("/debug/profile", params={"seconds": 0.05}, headers=HEADERS)
+
+    assert response.status_code == 200
+    assert isinstance(marshal.loads(response.content), dict)
+
+def test_profile_endpoint_text_summary():
+    response = client.get("/debug/profile", params={"seconds": 0.05, "format": "text"}, headers=HEADERS)
+
+    assert response.status_code == 200
+    assert "cumulative" in response.text
+
+def test_profile_endpoint_is_bounded_and_authenticated():
+    assert client.get("/debug/profile", params={"seconds": 3600}, headers=HEADERS).status_code == 422
+    assert client.get("/debug/profile", headers={"X-PAI-API-Key": "wrong-key"}).status_code == 401
@@ -0,0 +1,105 @@
+import json
+import time
+import uuid
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+from src.fast_codec import MessageValidationError, decode_message, encode_message_response
+from src.main import app
+from src.models import Message, MessageResponse
+
+client = TestClient(app)
+
+VALID_BODIES = [
+    {"sender": "pat", "content": "hi"},
+    {"sender": "pat", "content": "hi", "message_type": "task", "priority": "urgent", "context_id": "ctx"},
+    {"sender": "pat", "content": "hi", "context_id": None, "timestamp": "2024-05-01T12:00:00+00:00"},
+    {"sender": "pat", "content": "hi", "timestamp": 1714564800},
+    {"sender": "pat", "content": "hi", "timestamp": "1714564800"},
+]
+
+INVALID_BODIES = [
+    {"content": "hi"},
+    {"sender": "", "content": "hi"},
+    {"sender": "pat", "content": 5},
+    {"sender": "pat", "content": "hi", "message_type": "email"},
+    {"sender": "pat", "content": "hi", "priority": ["urgent"]},
+    {"sender": "pat", "content": "hi", "context_id": 7},
+    {"sender": "pat", "content": "hi", "timestamp": "yesterday"},
+    {"sender": "pat", "content": "hi", "timestamp": None},
+    ["not", "an", "object"],
+]
+
+@pytest.mark.parametrize("body", VALID_BODIES)
+def test_fast_path_accepts_what_pydantic_accepts(body):
+    expected = Message.model_validate(body)
+    message = decode_message(json.dumps(body).encode())
+
+    assert message["sender"] == expected.sender
+    assert message["content"] == expected.content
+    assert message["message_type"] == expected.message_type
+    assert message["priority"] == expected.priority
+    assert message["context_id"] == expected.context_id
+    if "timestamp" in body:
+        assert message["timestamp"] == expected.timestamp
+
+@pytest.mark.parametrize("body", INVALID_BODIES)
+def test_fast_path_rejects_what_pydantic_rejects(body):
+    with pytest.raises(ValidationError) as expected:
+        Message.model_validate(body)
+    with pytest.raises(MessageValidationError) as actual:
+        decode_message(json.dumps(body).encode())
+
+    assert sorted(tuple(e["loc"][1:]) for e in actual.value.errors) == \
+        sorted(e["loc"] for e in expected.value.errors())
+
+def test_fast_path_is_faster_than_pydantic():
+    body = json.dumps(VALID_BODIES[1]).encode()
+    rounds = 5000
+
+    def bench(fn) -> float:
+        # Best of three to keep a busy machine from failing the run
+        best = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                fn()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def pydantic_path():
+        message = Message.model_validate_json(body)
+        MessageResponse(status="received", id=message.sender).model_dump_json()
+
+    def fast_path():
+        message = decode_message(body)
+        encode_message_response(message["sender"])
+
+    slow, fast = bench(pydantic_path), bench(fast_path)
+    assert fast < slow, f"fast path {fast * 1e6 / rounds:.1f}us vs pydantic {slow * 1e6 / rounds:.1f}us per message"
+
+def test_inbox_response_matches_model():
+    response = client.post("/inbox", content=json.dumps(VALID_BODIES[0]), headers={"X-PAI-API-Key": "dev-key"})
+
+    assert response.status_code == 200
+    MessageResponse.model_validate(response.json())
+
+def test_inbox_rejects_invalid_body():
+    response = client.post("/inbox", content=b"{not json", headers={"X-PAI-API-Key": "dev-key"})
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["type"] == "json_invalid"
+
+def test_inbox_batch_reports_per_message_results():
+    sender = f"batch-{uuid.uuid4()}"
+    batch = [{"sender": sender, "content": "one"}, {"sender": sender}, {"sender": sender, "content": "three"}]
+    response = client.post("/inbox/batch", content=json.dumps(batch), headers={"X-PAI-API-Key": "dev-key"})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["received"] == 2
+    assert [r["status"] for r in data["results"]] == ["received", "error", "received"]
+    assert data["results"][1]["detail"][0]["loc"] == ["body", 1, "content"]
+
+    stored = client.get("/messages", params={"sender": sender}, headers={"X-PAI-API-Key": "dev-key"}).json()
+    assert {m["id"] for m in stored["messages"]} == {data["results"][0]["id"], data["results"][2]["id"]}
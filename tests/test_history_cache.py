@@ -0,0 +1,49 @@
+import sqlite3
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from src.db.change_sequence import ChangeSequence
+from src.db.repositories.message_repository import MessageRepository
+from src.main import app
+
+client = TestClient(app)
+HEADERS = {"X-PAI-API-Key": "dev-key"}
+
+def test_unchanged_history_returns_304_without_query():
+    first = client.get("/messages", params={"limit": 5}, headers=HEADERS)
+    etag = first.headers["ETag"]
+
+    with patch.object(MessageRepository, "get_message_history") as mock_history:
+        response = client.get("/messages", params={"limit": 5}, headers={**HEADERS, "If-None-Match": etag})
+        cached = client.get("/messages", params={"limit": 5}, headers=HEADERS)
+
+    mock_history.assert_not_called()
+    assert response.status_code == 304
+    assert cached.status_code == 200
+    assert cached.content == first.content
+
+def test_write_invalidates_etag_and_cache():
+    sender = "etag-test"
+    before = client.get("/messages", params={"sender": sender}, headers=HEADERS)
+
+    client.post("/inbox", json={"sender": sender, "content": "new"}, headers=HEADERS)
+    after = client.get("/messages", params={"sender": sender}, headers={**HEADERS, "If-None-Match": before.headers["ETag"]})
+
+    assert after.status_code == 200
+    assert after.headers["ETag"] != before.headers["ETag"]
+    assert after.json()["count"] == before.json()["count"] + 1
+
+def test_sequence_sees_writes_from_other_connections(tmp_path):
+    path = str(tmp_path / "other.db")
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("CREATE TABLE t (x)")
+    conn.commit()
+
+    sequence = ChangeSequence([path, f"{path}-wal"])
+    start = sequence.value
+    assert sequence.value == start
+
+    conn.execute("INSERT INTO t VALUES (1)")
+    conn.commit()
+    assert sequence.value > start
+    conn.close()
@@ -0,0 +1,80 @@
+import sqlite3
+import time
+import uuid
+from fastapi.testclient import TestClient
+from src.db.migrations import migrate
+from src.db.models import CREATE_TABLES_SQL
+from src.ids import new_message_id
+from src.main import app
+
+client = TestClient(app)
+HEADERS = {"X-PAI-API-Key": "dev-key"}
+
+def test_ids_are_uuid7_and_strictly_increasing():
+    ids = [new_message_id() for _ in range(10000)]
+
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+    assert all(uuid.UUID(i).version == 7 for i in ids[:10])
+
+def test_history_pages_by_id_cursor():
+    sender = f"pager-{uuid.uuid4()}"
+    for i in range(5):
+        client.post("/inbox", json={"sender": sender, "content": str(i)}, headers=HEADERS)
+
+    first = client.get("/messages", params={"sender": sender, "limit": 3}, headers=HEADERS).json()
+    second = client.get("/messages", params={"sender": sender, "limit": 3, "before": first["next_cursor"]}, headers=HEADERS).json()
+
+    assert [m["content"] for m in first["messages"]] == ["4", "3", "2"]
+    assert [m["content"] for m in second["messages"]] == ["1", "0"]
+    assert second["next_cursor"] is None
+
+def test_history_with_zero_limit_is_an_empty_page():
+    response = client.get("/messages", params={"limit": 0}, headers=HEADERS)
+
+    assert response.status_code == 200
+    assert response.json() == {"messages": [], "count": 0, "next_cursor": None}
+
+def test_migration_rewrites_legacy_ids_in_creation_order(tmp_path):
+    conn = sqlite3.connect(tmp_path / "legacy.db")
+    conn.executescript(CREATE_TABLES_SQL)
+    legacy = [("zzz", "2024-01-01 10:00:00"), ("aaa", "2024-01-01 10:00:00"), ("mmm", "2023-06-01 08:00:00")]
+    for msg_id, created_at in legacy:
+        conn.execute(
+            "INSERT INTO messages (id, sender, content, direction, status, created_at) VALUES (?, 'Bob', ?, 'outbox', 'sent', ?)",
+            (msg_id, msg_id, created_at)
+        )
+    conn.commit()
+
+    migrate(conn)
+
+    rows = conn.execute("SELECT content, id FROM messages ORDER BY id").fetchall()
+    assert [content for content, _ in rows] == ["mmm", "zzz", "aaa"]
+    assert all(uuid.UUID(msg_id).version == 7 for _, msg_id in rows)
+    # Deliveries follow their message
+    assert conn.execute("SELECT COUNT(*) FROM deliveries d JOIN messages m ON m.id = d.message_id").fetchone()[0] == 3
+    assert new_message_id() > rows[-1][1]
+    conn.close()
+
+def test_time_ordered_ids_insert_faster_on_large_table(tmp_path):
+    def insert_rate(name: str, make_id) -> float:
+        conn = sqlite3.connect(tmp_path / f"{name}.db")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA cache_size = -1000")  # 1 MB, far smaller than the key index
+        conn.execute("CREATE TABLE messages (id TEXT PRIMARY KEY, content TEXT NOT NULL)")
+        conn.executemany("INSERT INTO messages VALUES (?, ?)", ((make_id(), "x" * 200) for _ in range(100_000)))
+        conn.commit()
+
+        start = time.perf_counter()
+        for i in range(10_000):
+            conn.execute("INSERT INTO messages VALUES (?, ?)", (make_id(), "x" * 200))
+            if i % 100 == 99:
+                conn.commit()
+        conn.commit()
+        elapsed = time.perf_counter() - start
+        conn.close()
+        return 10_000 / elapsed
+
+    random_rate = insert_rate("uuid4", lambda: str(uuid.uuid4()))
+    ordered_rate = insert_rate("uuid7", new_message_id)
+    assert ordered_rate > random_rate, f"UUIDv7 {ordered_rate:.0f}/s vs UUID4 {random_rate:.0f}/s"
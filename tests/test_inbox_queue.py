@@ -0,0 +1,138 @@
+import asyncio
+import sqlite3
+import uuid
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi.testclient import TestClient
+from src.blob_store import BlobStore
+from src.db.connection import get_async_db
+from src.db.repositories.message_repository import MessageRepository
+from src.main import app
+
+client = TestClient(app)
+HEADERS = {"X-PAI-API-Key": "dev-key"}
+
+async def store(repo: MessageRepository, priority: str = "normal", message_type: str = "task") -> str:
+    msg_id = str(uuid.uuid4())
+    await repo.store_inbox_message(msg_id, "pat", f"do {msg_id}", message_type, priority)
+    return msg_id
+
+@pytest.mark.asyncio
+async def test_concurrent_claims_never_overlap(repo):
+    ids = {await store(repo) for _ in range(10)}
+
+    leases = await asyncio.gather(*(repo.claim_inbox_messages(limit=4) for _ in range(3)))
+    claimed = [m["id"] for lease in leases for m in lease["messages"]]
+
+    assert sorted(claimed) == sorted(ids)
+    assert (await repo.claim_inbox_messages())["messages"] == []
+
+@pytest.mark.asyncio
+async def test_claim_orders_by_priority_and_filters_by_type(repo):
+    normal = await store(repo, "normal")
+    urgent = await store(repo, "urgent")
+    high = await store(repo, "high")
+    await store(repo, "urgent", message_type="text")
+
+    lease = await repo.claim_inbox_messages(message_type="task")
+
+    assert [m["id"] for m in lease["messages"]] == [urgent, high, normal]
+    assert all(m["delivery_count"] == 1 for m in lease["messages"])
+
+@pytest.mark.asyncio
+async def test_ack_and_nack_with_visibility_timeout(repo):
+    done, retry = await store(repo), await store(repo)
+    lease = await repo.claim_inbox_messages()
+
+    assert await repo.ack_inbox_messages(lease["lease_id"], [done]) == [done]
+    assert await repo.nack_inbox_messages(lease["lease_id"], [retry], delay=60) == [retry]
+
+    # Acked is gone for good; nacked stays hidden until its delay passes
+    assert (await repo.claim_inbox_messages())["messages"] == []
+    await repo.conn.execute("UPDATE messages SET lease_expires_at = 0 WHERE id = ?", (retry,))
+    again = await repo.claim_inbox_messages()
+    assert [m["id"] for m in again["messages"]] == [retry]
+    assert again["messages"][0]["delivery_count"] == 2
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_reclaimed_and_cannot_ack(repo):
+    msg_id = await store(repo)
+    stale = await repo.claim_inbox_messages(visibility_timeout=0.01)
+    await asyncio.sleep(0.02)
+
+    fresh = await repo.claim_inbox_messages()
+    assert [m["id"] for m in fresh["messages"]] == [msg_id]
+    assert await repo.ack_inbox_messages(stale["lease_id"], [msg_id]) == []
+    assert await repo.ack_inbox_messages(fresh["lease_id"], [msg_id]) == [msg_id]
+
+def test_claim_endpoints_round_trip():
+    message_type = "query"
+    client.post("/inbox", json={"sender": "pat", "content": "q?", "message_type": message_type, "priority": "urgent"}, headers=HEADERS)
+
+    lease = client.post("/inbox/claim", json={"message_type": message_type, "priorities": ["urgent"], "limit": 100}, headers=HEADERS).json()
+    ids = [m["id"] for m in lease["messages"]]
+    assert lease["count"] == len(ids) >= 1
+
+    response = client.post("/inbox/ack", json={"lease_id": lease["lease_id"], "ids": ids}, headers=HEADERS)
+    assert response.json()["acked"] == ids
+
+@pytest.mark.asyncio
+async def test_inbox_batch_is_all_or_nothing(repo):
+    existing = await store(repo)
+    batch = [
+        {"id": msg_id, "sender": "batcher", "content": "hi", "message_type": "text", "priority": "normal", "context_id": None}
+        for msg_id in (str(uuid.uuid4()), existing)
+    ]
+
+    with pytest.raises(sqlite3.IntegrityError):
+        await repo.store_inbox_messages(batch)
+
+    assert await repo.get_message_by_id(batch[0]["id"]) is None
+    assert await repo.get_message_history(sender="batcher") == []
+
+@pytest.mark.asyncio
+async def test_failing_request_keeps_concurrent_writes(repo):
+    shared = MagicMock()
+    shared.get_async_connection = AsyncMock(return_value=repo.conn)
+    interned, resume = asyncio.Event(), asyncio.Event()
+    intern_senders = repo._intern_senders
+
+    async def paused_intern(names):
+        # Hold the first writer mid-transaction, after its sender upsert
+        await intern_senders(names)
+        if not interned.is_set():
+            interned.set()
+            await resume.wait()
+
+    async def write(i: int) -> str:
+        msg_id = str(uuid.uuid4())
+        await repo.store_inbox_message(msg_id, f"writer-{i}", "hi", "text", "normal")
+        return msg_id
+
+    async def failing_request():
+        await interned.wait()
+        try:
+            async with get_async_db():
+                raise RuntimeError("handler failed")
+        finally:
+            resume.set()
+
+    with patch("src.db.connection.get_db_connection", return_value=shared), \
+            patch.object(repo, "_intern_senders", paused_intern):
+        results = await asyncio.gather(*(write(i) for i in range(10)), failing_request(), return_exceptions=True)
+
+    assert all(isinstance(msg_id, str) for msg_id in results[:10]), results
+    assert isinstance(results[10], RuntimeError)
+    for msg_id in results[:10]:
+        assert await repo.get_message_by_id(msg_id) is not None
+
+@pytest.mark.asyncio
+async def test_claim_returns_out_of_line_content(repo, tmp_path):
+    blob_repo = MessageRepository(repo.conn, blobs=BlobStore(str(tmp_path / "blobs"), threshold=1024))
+    content = "step " * 1000
+    await blob_repo.store_inbox_message(str(uuid.uuid4()), "pat", content, "task", "normal")
+
+    lease = await blob_repo.claim_inbox_messages()
+
+    assert lease["messages"][0]["blob_sha256"] is not None
+    assert lease["messages"][0]["content"] == content
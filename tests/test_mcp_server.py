@@ -0,0 +1,82 @@
+import json
+import subprocess
+import sys
+import uuid
+import pytest
+import httpx
+from unittest.mock import patch, AsyncMock
+from pydantic import SecretStr
+from src.peers import Peer, PeerRegistry
+
+# Modules the MCP bridge must not load until a tool is actually called
+DEFERRED_MODULES = ["src.client", "src.peers", "src.db.connection", "aiosqlite", "zeroconf", "websockets"]
+
+IMPORT_BENCHMARK = """
+import json, sys, time
+# The MCP SDK itself is a fixed cost; only measure what the bridge adds on top
+import mcp.server, mcp.server.stdio, mcp.types
+start = time.perf_counter()
+import src.mcp_server
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "elapsed_ms": elapsed * 1000,
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+""" % (DEFERRED_MODULES,)
+
+def run_import_benchmark() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_BENCHMARK],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_mcp_server_defers_heavy_imports():
+    assert run_import_benchmark()["loaded"] == []
+
+def test_mcp_server_import_time():
+    # Best of three to keep a busy machine from failing the run
+    best = min(run_import_benchmark()["elapsed_ms"] for _ in range(3))
+    assert best < 100, f"src.mcp_server import took {best:.1f}ms"
+
+@pytest.mark.asyncio
+async def test_get_thread_tool():
+    from src.mcp_server import call_tool
+
+    context_id = f"thread-{uuid.uuid4()}"
+    registry = PeerRegistry([Peer("Patterson", "http://localhost:8001", SecretStr("key"))])
+    with patch("src.client.get_peer_registry", return_value=registry), \
+         patch("httpx.AsyncClient.post", new_callable=AsyncMock) as mock_post:
+        mock_post.side_effect = httpx.RequestError("Network Boom", request=None)
+        await call_tool("send_message", {"content": "first", "context_id": context_id})
+        await call_tool("send_message", {"content": "second", "context_id": context_id})
+
+    result = await call_tool("get_thread", {"context_id": context_id})
+    thread = json.loads(result[0].text)
+
+    assert thread["count"] == 2
+    assert [m["content"] for m in thread["messages"]] == ["first", "second"]
+
+@pytest.mark.asyncio
+async def test_history_tools_return_blob_content(tmp_path):
+    from src.blob_store import BlobStore
+    from src.db.connection import get_async_db
+    from src.db.repositories.message_repository import MessageRepository
+    from src.mcp_server import call_tool
+
+    blobs = BlobStore(str(tmp_path / "blobs"), threshold=1024)
+    sender = f"big-{uuid.uuid4()}"
+    content = "large " * 500
+    with patch("src.blob_store._blob_store", blobs):
+        async with get_async_db() as db:
+            await MessageRepository(db).store_inbox_message(
+                str(uuid.uuid4()), sender, content, "text", "normal", context_id=sender
+            )
+
+        history = json.loads((await call_tool("get_history", {"sender": sender}))[0].text)
+        thread = json.loads((await call_tool("get_thread", {"context_id": sender}))[0].text)
+
+    assert [m["content"] for m in history["messages"]] == [content]
+    assert [m["content"] for m in thread["messages"]] == [content]
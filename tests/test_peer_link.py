@@ -0,0 +1,92 @@
+import pytest
+import asyncio
+import json
+from unittest.mock import patch, AsyncMock
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from pydantic import SecretStr
+from src.main import app
+from src.peers import Peer, PeerRegistry
+from src.peer_link import LinkUnavailable
+from src.client import send_to_remote
+
+client = TestClient(app)
+
+def test_link_acks_pipelined_frames():
+    with client.websocket_connect("/link", headers={"X-PAI-API-Key": "dev-key"}) as ws:
+        # Send several frames before reading any ack
+        for seq in range(1, 4):
+            ws.send_json({"type": "message", "seq": seq, "message": {"sender": "pat", "content": f"msg {seq}"}})
+        ws.send_json({"type": "message", "seq": 4, "message": {"sender": "pat", "content": ""}})
+
+        acks = [ws.receive_json() for _ in range(4)]
+
+    assert [ack["seq"] for ack in acks] == [1, 2, 3, 4]
+    assert all(ack["type"] == "ack" and ack["id"] for ack in acks[:3])
+    assert acks[3]["type"] == "nack"
+
+def test_link_rejects_invalid_key():
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect("/link", headers={"X-PAI-API-Key": "wrong-key"}) as ws:
+            ws.receive_json()
+
+class LoopbackConnection:
+    """Acks every frame it is sent, like the /link endpoint."""
+
+    def __init__(self):
+        self.acks: asyncio.Queue = asyncio.Queue()
+        self.sent = []
+
+    async def send(self, raw):
+        frame = json.loads(raw)
+        self.sent.append(frame)
+        await self.acks.put(json.dumps({"type": "ack", "seq": frame["seq"], "id": f"id-{frame['seq']}", "status": "received"}))
+
+    async def close(self):
+        await self.acks.put(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        raw = await self.acks.get()
+        if raw is None:
+            raise StopAsyncIteration
+        return raw
+
+@pytest.mark.asyncio
+async def test_peer_link_pipelines_over_one_connection():
+    peer = Peer("Patterson", "http://localhost:8001", SecretStr("key"))
+    connection = LoopbackConnection()
+
+    with patch.object(peer.link, "_open", new=AsyncMock(return_value=connection)) as mock_open:
+        results = await asyncio.gather(*(
+            peer.link.send("http://localhost:8001", {"sender": "Bob", "content": str(i)}) for i in range(5)
+        ))
+
+    mock_open.assert_called_once()
+    assert sorted(result["id"] for result in results) == [f"id-{seq}" for seq in range(1, 6)]
+    await peer.close()
+
+@pytest.mark.asyncio
+async def test_send_falls_back_to_http_when_link_unavailable():
+    peer = Peer("Patterson", "http://localhost:8001", SecretStr("key"))
+    registry = PeerRegistry([peer])
+
+    with patch("src.client.get_peer_registry", return_value=registry), \
+         patch("src.client.settings.PEER_LINK_ENABLED", True), \
+         patch.object(peer.link, "_open", new=AsyncMock(side_effect=OSError("refused"))), \
+         patch("httpx.AsyncClient.post", new_callable=AsyncMock) as mock_post:
+        mock_response = AsyncMock()
+        mock_response.json = lambda: {"status": "received", "id": "123"}
+        mock_response.raise_for_status = lambda: None
+        mock_post.return_value = mock_response
+
+        result = await send_to_remote("Hello")
+
+        assert result["status"] == "received"
+        mock_post.assert_called_once()
+
+        # The failed connect is not retried on the next send
+        with pytest.raises(LinkUnavailable):
+            await peer.link.send("http://localhost:8001", {})
@@ -0,0 +1,102 @@
+import pytest
+import sqlite3
+from unittest.mock import patch, AsyncMock
+from pydantic import SecretStr
+from src.peers import Peer, PeerRegistry
+from src.client import broadcast_to_peers, send_to_remote
+from src.db.connection import get_db_connection
+from src.db.migrations import migrate, MIGRATIONS
+from src.db.models import CREATE_TABLES_SQL, MessageStatus
+from src.db.repositories.message_repository import MessageRepository
+
+import httpx
+
+def make_registry(*names):
+    return PeerRegistry([Peer(name, f"http://{name.lower()}:8000", SecretStr("key")) for name in names])
+
+def test_registry_routing():
+    registry = make_registry("Patterson", "Alice")
+    assert registry.default.name == "Patterson"
+    assert registry.get() is registry.default
+    assert registry.get("alice").name == "Alice"
+    assert registry.get("nobody") is None
+    assert registry.names == ["Patterson", "Alice"]
+
+@pytest.mark.asyncio
+async def test_send_to_unknown_recipient():
+    with patch("src.client.get_peer_registry", return_value=make_registry("Patterson")):
+        result = await send_to_remote("hello", recipient="nobody")
+        assert result["status"] == "error"
+
+@pytest.mark.asyncio
+async def test_broadcast_stores_content_once():
+    registry = make_registry("Patterson", "Alice", "Carol")
+
+    async def fake_post(url, **kwargs):
+        if "carol" in url:
+            raise httpx.RequestError("Carol down", request=None)
+        response = AsyncMock()
+        response.json = lambda: {"status": "received", "id": "remote-id"}
+        response.raise_for_status = lambda: None
+        return response
+
+    with patch("src.client.get_peer_registry", return_value=registry):
+        with patch("httpx.AsyncClient.post", new_callable=AsyncMock) as mock_post:
+            mock_post.side_effect = fake_post
+            result = await broadcast_to_peers("hello everyone")
+
+    assert mock_post.call_count == 3
+    assert result["status"] == "partial"
+    assert result["deliveries"]["Patterson"]["status"] == "received"
+    assert result["deliveries"]["Carol"]["status"] == "error"
+
+    conn = await get_db_connection().get_async_connection()
+    async with conn.execute("SELECT COUNT(*) FROM messages WHERE id = ?", (result["id"],)) as cursor:
+        assert (await cursor.fetchone())[0] == 1
+    async with conn.execute(
+        "SELECT recipient, status FROM deliveries WHERE message_id = ? ORDER BY recipient", (result["id"],)
+    ) as cursor:
+        assert [tuple(row) for row in await cursor.fetchall()] == [
+            ("Alice", "sent"), ("Carol", "failed"), ("Patterson", "sent")
+        ]
+    message = await MessageRepository(conn).get_message_by_id(result["id"])
+    assert message["status"] == "failed"
+
+def test_migrate_backfills_legacy_outbox(tmp_path):
+    conn = sqlite3.connect(tmp_path / "legacy.db")
+    conn.executescript(CREATE_TABLES_SQL)
+    conn.execute(
+        "INSERT INTO messages (id, sender, content, direction, status) VALUES ('m1', 'Bob', 'hi', 'outbox', 'failed')"
+    )
+    conn.commit()
+
+    migrate(conn)
+    migrate(conn)  # Idempotent
+
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+    # The legacy ID is rewritten by a later migration; match on the row instead
+    assert conn.execute(
+        "SELECT m.content, d.status FROM deliveries d JOIN messages m ON m.id = d.message_id"
+    ).fetchall() == [("hi", "failed")]
+    conn.close()
+
+@pytest.mark.asyncio
+async def test_outbox_batch_is_all_or_nothing(repo):
+    batch = [
+        {"id": msg_id, "sender": "me", "content": "hi", "message_type": "text", "priority": "normal",
+         "context_id": None, "recipients": recipients}
+        for msg_id, recipients in (("ok", ["Bob"]), ("dup", ["Bob", "Bob"]))
+    ]
+
+    with pytest.raises(sqlite3.IntegrityError):
+        await repo.store_outbox_messages(batch)
+
+    assert await repo.get_message_by_id("ok") is None
+    assert await repo.get_pending_outbox_messages("Bob") == []
+
+@pytest.mark.asyncio
+async def test_outbox_message_and_deliveries_stored_together(repo):
+    with pytest.raises(sqlite3.IntegrityError):
+        await repo.store_outbox_message("m1", "me", "hi", "text", "normal", MessageStatus.PENDING_SEND, ["Bob", "Bob"])
+
+    assert await repo.get_message_by_id("m1") is None
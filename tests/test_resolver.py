@@ -2,6 +2,8 @@ import pytest
 from unittest.mock import patch, AsyncMock
 from src.client import send_to_remote
 from src.resolver import resolve_mdns
+from src.peers import Peer, PeerRegistry
+from pydantic import SecretStr
 import httpx
 
 def test_resolver_passthrough():
@@ -27,12 +29,9 @@ async def test_send_to_remote_resolves_mdns():
             mock_response.raise_for_status = lambda: None
             mock_post.return_value = mock_response
             
-            # Assuming settings.REMOTE_PAI_URL is configured to something with .local in tests or we override it
-            with patch("src.client.settings") as mock_settings:
-                mock_settings.REMOTE_PAI_URL = "http://myhost.local:8000"
-                mock_settings.REMOTE_PAI_API_KEY.get_secret_value.return_value = "key"
-                mock_settings.SYSTEM_NAME = "Bob"
-                
+            # Point the default peer at a .local host
+            registry = PeerRegistry([Peer("Patterson", "http://myhost.local:8000", SecretStr("key"))])
+            with patch("src.client.get_peer_registry", return_value=registry):
                 await send_to_remote("hello")
                 
                 # Verify URL was rewritten to IP
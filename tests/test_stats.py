@@ -0,0 +1,102 @@
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi.testclient import TestClient
+from src.db.migrations import migrate
+from src.db.models import CREATE_TABLES_SQL, MessageStatus
+from src.main import app
+
+client = TestClient(app)
+HEADERS = {"X-PAI-API-Key": "dev-key"}
+
+# One bucket covering the whole window, so a test running across the hour still sees one row
+WHOLE_WINDOW = 3600 * 1_000_000
+
+def hour_window() -> tuple[int, int]:
+    now = int(time.time())
+    return now - now % 3600 - 3600, now - now % 3600 + 3600
+
+@pytest.mark.asyncio
+async def test_rollup_follows_inserts_and_delivery_failures(repo):
+    await repo.store_inbox_message(str(uuid.uuid4()), "ann", "hi", "text", "normal")
+    await repo.store_inbox_message(str(uuid.uuid4()), "ann", "do", "task", "high")
+    await repo.store_outbox_messages([
+        {"id": msg_id, "sender": "me", "content": "yo", "message_type": "text", "priority": "normal",
+         "context_id": None, "recipients": ["Bob"]}
+        for msg_id in ("o1", "o2")
+    ])
+    await repo.update_delivery_status("o1", "Bob", MessageStatus.FAILED, "timeout")
+
+    since, until = hour_window()
+    totals = await repo.get_message_stats(since, until, interval=WHOLE_WINDOW)
+    by_sender = await repo.get_message_stats(since, until, interval=WHOLE_WINDOW, group_by=["sender", "direction"])
+
+    assert [(r["messages"], r["outbox"], r["failed"]) for r in totals] == [(4, 2, 1)]
+    assert [(r["sender"], r["direction"], r["messages"], r["failed"]) for r in by_sender] == [
+        ("ann", "inbox", 2, 0), ("me", "outbox", 2, 1)
+    ]
+
+    # A retry that succeeds takes the failure back out
+    await repo.update_delivery_status("o1", "Bob", MessageStatus.SENT)
+    assert (await repo.get_message_stats(since, until, interval=WHOLE_WINDOW))[0]["failed"] == 0
+
+@pytest.mark.asyncio
+async def test_stats_read_rollup_by_bucket_range(repo):
+    async with repo.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT SUM(messages) FROM message_stats WHERE bucket >= 0 AND bucket < 3600"
+    ) as cursor:
+        plan = [row[3] for row in await cursor.fetchall()]
+    assert plan == ["SEARCH message_stats USING PRIMARY KEY (bucket>? AND bucket<?)"]
+
+def test_migration_backfills_existing_messages(tmp_path):
+    conn = sqlite3.connect(tmp_path / "legacy.db")
+    conn.executescript(CREATE_TABLES_SQL)
+    conn.executemany(
+        "INSERT INTO messages (id, sender, content, direction, status, created_at) VALUES (?, 'Bob', 'hi', 'outbox', ?, ?)",
+        [("m1", "failed", "2024-01-01 10:15:00"), ("m2", "sent", "2024-01-01 10:45:00"), ("m3", "sent", "2024-01-01 11:00:00")]
+    )
+    conn.commit()
+
+    migrate(conn)
+
+    assert conn.execute("SELECT bucket, messages, failed FROM message_stats ORDER BY bucket").fetchall() == [
+        (1704103200, 2, 1), (1704106800, 1, 0)
+    ]
+    conn.close()
+
+def test_stats_endpoint_groups_by_sender():
+    sender = f"stats-{uuid.uuid4()}"
+    for _ in range(3):
+        client.post("/inbox", json={"sender": sender, "content": "hi", "message_type": "query"}, headers=HEADERS)
+
+    response = client.get("/stats", params={"interval": "day", "group_by": ["sender", "message_type"]}, headers=HEADERS)
+
+    assert response.status_code == 200
+    rows = [row for row in response.json()["buckets"] if row["sender"] == sender]
+    assert [(row["message_type"], row["messages"], row["failure_rate"]) for row in rows] == [("query", 3, None)]
+    assert response.json()["totals"]["messages"] >= 3
+
+def test_stats_endpoint_validates_parameters():
+    assert client.get("/stats", params={"group_by": "content"}, headers=HEADERS).status_code == 422
+    assert client.get(
+        "/stats", params={"since": "2024-01-02T00:00:00", "until": "2024-01-01T00:00:00"}, headers=HEADERS
+    ).status_code == 422
+
+def test_stats_day_buckets_cover_whole_days():
+    sender = f"daily-{uuid.uuid4()}"
+    client.post("/inbox", json={"sender": sender, "content": "hi"}, headers=HEADERS)
+    now = datetime.now(timezone.utc)
+    day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    # Until is part-way through the day; the bucket still runs to midnight
+    response = client.get(
+        "/stats",
+        params={"interval": "day", "group_by": "sender", "since": day.isoformat(), "until": now.isoformat()},
+        headers=HEADERS
+    ).json()
+
+    assert response["since"] == day.isoformat()
+    assert response["until"] == (day + timedelta(days=1)).isoformat()
+    assert [(row["bucket"], row["messages"]) for row in response["buckets"] if row["sender"] == sender] == [(day.isoformat(), 1)]
@@ -0,0 +1,78 @@
+import json
+import httpx
+import pytest
+from unittest.mock import patch
+from pydantic import SecretStr
+from src import tracing
+from src.client import send_to_remote
+from src.main import app
+from src.peers import Peer, PeerRegistry
+
+class MemoryExporter:
+    def __init__(self):
+        self.spans = []
+
+    async def export(self, spans):
+        self.spans.extend(spans)
+
+@pytest.mark.asyncio
+async def test_delivery_is_traced_across_peers():
+    exporter = MemoryExporter()
+    tracer = tracing.Tracer(exporter)
+    # Deliver straight into this app, standing in for the remote peer
+    peer = Peer("Patterson", "http://patterson:8000", SecretStr("dev-key"))
+    peer._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+
+    with patch("src.tracing._tracer", tracer), \
+         patch("src.client.get_peer_registry", return_value=PeerRegistry([peer])):
+        result = await send_to_remote("traced")
+        await tracer.flush()
+    await peer.close()
+
+    assert result["status"] == "received"
+    trace_id = tracing.message_trace_id(result["outbox_id"])
+    spans = {s.name: s for s in exporter.spans if s.name != "db.commit"}
+    assert {s.trace_id for s in exporter.spans} == {trace_id}
+    assert {"send", "deliver", "resolve", "http.post", "receive"} <= set(spans)
+
+    # The receiving side continues the sender's trace
+    assert spans["receive"].parent_id == spans["http.post"].span_id
+    assert spans["deliver"].parent_id == spans["send"].span_id
+    assert spans["receive"].attributes["pai.e2e_latency_ms"] >= 0
+
+    commits = [s for s in exporter.spans if s.name == "db.commit"]
+    assert {c.parent_id for c in commits} == {spans["send"].span_id, spans["deliver"].span_id, spans["receive"].span_id}
+    assert tracer.latency.count == 1
+
+@pytest.mark.asyncio
+async def test_file_exporter_writes_json_lines(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = tracing.Tracer(tracing.FileExporter(str(path)))
+
+    with patch("src.tracing._tracer", tracer):
+        with tracing.span("outer", trace_id="ab" * 16):
+            with pytest.raises(ValueError):
+                with tracing.span("inner", **{"pai.peer": "Patterson"}):
+                    raise ValueError("boom")
+        await tracer.flush()
+
+    inner, outer = [json.loads(line) for line in path.read_text().splitlines()]
+    assert inner["parent_id"] == outer["span_id"]
+    assert inner["trace_id"] == outer["trace_id"] == "ab" * 16
+    assert inner["error"] == "ValueError: boom"
+    assert inner["attributes"] == {"pai.peer": "Patterson"}
+
+def test_otlp_encoding_and_traceparent_parsing():
+    parsed = tracing.parse_traceparent("00-" + "1" * 32 + "-" + "2" * 16 + "-01")
+    assert parsed == ("1" * 32, "2" * 16)
+    assert tracing.parse_traceparent("garbage") is None
+
+    span = tracing.start_span("receive", parent=parsed, **{"pai.attempt": 2})
+    span.end_ns = span.start_ns + 1000
+    encoded = tracing.OtlpExporter("http://collector/v1/traces", "Bob").encode([span])
+
+    otlp_span = encoded["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert otlp_span["traceId"] == "1" * 32
+    assert otlp_span["parentSpanId"] == "2" * 16
+    assert otlp_span["attributes"] == [{"key": "pai.attempt", "value": {"intValue": "2"}}]
+    assert otlp_span["status"] == {"code": 1}